@@ -1,6 +1,7 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel, EmailStr
 from config.database import db
+from utils.rate_limit import read_rate_limit
 from typing import Optional, List
 from fastapi.encoders import jsonable_encoder
 from bson import ObjectId
@@ -89,7 +90,7 @@ async def register_user(user: UserCreate):
     }
 
 
-@router.get("/user/{firebase_uid}")
+@router.get("/user/{firebase_uid}", dependencies=[Depends(read_rate_limit)])
 async def get_user(firebase_uid: str):
     logger.info(f"Endpoint /user/{firebase_uid} called")
     try:
@@ -157,7 +158,11 @@ async def delete_user(firebase_uid: str):
     return {"message": "User account deleted successfully"}
 
 
-@router.get("/search/doctors", response_model=SearchDoctorsResponse)
+@router.get(
+    "/search/doctors",
+    response_model=SearchDoctorsResponse,
+    dependencies=[Depends(read_rate_limit)],
+)
 async def search_doctors(q: str = "", page: int = 1, limit: int = 5):
     logger.info(
         f"Endpoint /search/doctors called with query: {q}, page: {page}, limit: {limit}"
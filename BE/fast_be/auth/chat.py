@@ -1,6 +1,7 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from config.database import db
+from utils.rate_limit import read_rate_limit
 from typing import List
 import logging
 
@@ -76,7 +77,11 @@ async def create_chat_room(chat_room: ChatRoomCreate):
     }
 
 
-@router.get("/chat/rooms/{firebase_uid}", response_model=List[ChatRoomResponse])
+@router.get(
+    "/chat/rooms/{firebase_uid}",
+    response_model=List[ChatRoomResponse],
+    dependencies=[Depends(read_rate_limit)],
+)
 async def get_chat_rooms(firebase_uid: str):
     logger.info(f"Fetching chat rooms for user {firebase_uid}")
 
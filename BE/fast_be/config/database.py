@@ -1,5 +1,6 @@
 from motor.motor_asyncio import AsyncIOMotorClient
 from dotenv import load_dotenv
+from utils.metrics import MongoCommandCounter
 import os
 
 # Load environment variables
@@ -11,7 +12,7 @@ MONGO_URI = os.getenv(
 )  # Default to localhost if not set
 
 # Initialize MongoDB client
-client = AsyncIOMotorClient(MONGO_URI)
+client = AsyncIOMotorClient(MONGO_URI, event_listeners=[MongoCommandCounter()])
 db = client["fdpDB"]  # Database name: fdpDB
 
 
@@ -0,0 +1,124 @@
+import asyncio
+import itertools
+import os
+from typing import List, Tuple
+
+from fastapi import HTTPException
+
+from inference.model import CLASS_NAMES
+from inference.protocol import (
+    OP_PREDICT,
+    STATUS_OK,
+    decode_error,
+    decode_prediction,
+    parse_address,
+    read_header,
+    write_frame,
+)
+
+# Remote inference settings (all optional, read from the environment)
+INFERENCE_ADDRESS = os.getenv("INFERENCE_ADDRESS", "unix:/tmp/fdp-inference.sock")
+INFERENCE_POOL_SIZE = int(os.getenv("INFERENCE_POOL_SIZE", "8"))
+INFERENCE_TIMEOUT = float(os.getenv("INFERENCE_TIMEOUT", "30"))
+
+# Largest response frame: an error carrying a long detail message
+MAX_RESPONSE_BYTES = 64 * 1024
+
+
+class _IdleConnectionClosed(Exception):
+    """A pooled connection failed before any response byte arrived."""
+
+
+class _ConnectionPool:
+    """Persistent connections to one inference server address."""
+
+    def __init__(self, address: str, size: int):
+        self.address = address
+        self.size = size
+        self._loop = None
+
+    def _bind_loop(self) -> None:
+        # Streams belong to the loop that opened them; start afresh if the
+        # pool is used from a new event loop (e.g. after a reload)
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._idle: asyncio.LifoQueue = asyncio.LifoQueue()
+            self._slots = asyncio.Semaphore(self.size)
+
+    async def _connect(self):
+        scheme, host_or_path, port = parse_address(self.address)
+        if scheme == "unix":
+            return await asyncio.open_unix_connection(host_or_path)
+        return await asyncio.open_connection(host_or_path, port)
+
+    async def request(self, kind: int, payload: bytes) -> Tuple[int, bytes]:
+        self._bind_loop()
+        async with self._slots:
+            try:
+                reader, writer = self._idle.get_nowait()
+            except asyncio.QueueEmpty:
+                reader, writer = await self._connect()
+                return await self._exchange(reader, writer, kind, payload)
+            try:
+                return await self._exchange(reader, writer, kind, payload, True)
+            except _IdleConnectionClosed:
+                # The server closed the idle connection (e.g. it restarted)
+                # before answering anything; resend once on a fresh one
+                reader, writer = await self._connect()
+                return await self._exchange(reader, writer, kind, payload)
+
+    async def _exchange(
+        self, reader, writer, kind: int, payload: bytes, reused: bool = False
+    ) -> Tuple[int, bytes]:
+        try:
+            try:
+                write_frame(writer, kind, payload)
+                await writer.drain()
+                response_kind, length = await read_header(reader, MAX_RESPONSE_BYTES)
+            except (ConnectionError, asyncio.IncompleteReadError) as e:
+                if reused and not getattr(e, "partial", b""):
+                    raise _IdleConnectionClosed() from e
+                raise
+            response = await reader.readexactly(length) if length else b""
+        except BaseException:
+            # The stream may hold half a frame; never reuse it
+            writer.close()
+            raise
+        self._idle.put_nowait((reader, writer))
+        return response_kind, response
+
+
+class InferenceClient:
+    """Sends predictions to one or more inference servers, round-robin."""
+
+    def __init__(self, addresses: List[str], pool_size: int, timeout: float):
+        self._pools = [_ConnectionPool(address, pool_size) for address in addresses]
+        self._next = itertools.cycle(self._pools)
+        self.timeout = timeout
+
+    async def predict(self, img_data: bytes) -> Tuple[str, float, str]:
+        """Return (class name, confidence, server's model version)."""
+        pool = next(self._next)
+        try:
+            kind, payload = await asyncio.wait_for(
+                pool.request(OP_PREDICT, img_data), self.timeout
+            )
+        except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError) as e:
+            raise HTTPException(
+                status_code=503,
+                detail=f"Inference service unavailable at {pool.address}: {str(e)}",
+            )
+        if kind != STATUS_OK:
+            status_code, detail = decode_error(payload)
+            raise HTTPException(status_code=status_code, detail=detail)
+        class_index, confidence, model_version = decode_prediction(payload)
+        return CLASS_NAMES[class_index], confidence, model_version
+
+
+def create_client() -> InferenceClient:
+    return InferenceClient(
+        [a.strip() for a in INFERENCE_ADDRESS.split(",") if a.strip()],
+        INFERENCE_POOL_SIZE,
+        INFERENCE_TIMEOUT,
+    )
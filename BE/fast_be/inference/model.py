@@ -0,0 +1,223 @@
+import os
+import threading
+
+import numpy as np
+from PIL import Image
+
+from utils.metrics import stage_timer
+from utils.uploads import open_image_checked
+
+MODEL_DIR = os.path.join(os.path.dirname(__file__), "..")
+
+# Artifacts per model variant; int8/float16 are produced by inference/quantize.py
+MODEL_VARIANTS = {
+    "float32": "face_disease_mobilenetv2_v2.h5",
+    "int8": "face_disease_mobilenetv2_v2_int8.tflite",
+    "float16": "face_disease_mobilenetv2_v2_float16.tflite",
+}
+
+# FDP_MODEL_VARIANT selects one of MODEL_VARIANTS; FDP_MODEL_PATH overrides
+# the file outright (.h5/.keras for Keras, .tflite for TFLite)
+MODEL_VARIANT = os.getenv("FDP_MODEL_VARIANT", "float32").lower()
+if MODEL_VARIANT not in MODEL_VARIANTS:
+    raise RuntimeError(
+        f"Unknown FDP_MODEL_VARIANT '{MODEL_VARIANT}', "
+        f"expected one of {', '.join(MODEL_VARIANTS)}"
+    )
+
+# Define the absolute path to the model file
+MODEL_PATH = os.getenv(
+    "FDP_MODEL_PATH", os.path.join(MODEL_DIR, MODEL_VARIANTS[MODEL_VARIANT])
+)
+
+# Define class labels
+CLASS_NAMES = [
+    "Actinic Keratosis",
+    "Basal Cell Carcinoma",
+    "Eczemaa",
+    "Rosacea",
+    "Acne",
+]
+
+IMG_SIZE = (224, 224)
+
+# Threads each TFLite interpreter uses per predict() call. inference/quantize.py
+# benchmarks with the same value so its latency report matches serving.
+TFLITE_THREADS = int(os.getenv("FDP_TFLITE_THREADS", "1"))
+
+# Set FDP_STUB_MODEL=1 to serve a deterministic stand-in model (load tests,
+# machines without TensorFlow). TensorFlow is then never imported.
+USE_STUB_MODEL = os.getenv("FDP_STUB_MODEL", "0").lower() in ("1", "true", "yes")
+
+# Stored with every scan so inference/rescore.py can find stale predictions.
+# Defaults to the artifact's file name; set it explicitly when retraining
+# reuses the same name. In remote mode the inference server reports its own.
+if USE_STUB_MODEL:
+    MODEL_VERSION = "stub"
+else:
+    MODEL_VERSION = os.getenv("FDP_MODEL_VERSION", os.path.basename(MODEL_PATH))
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_model():
+    """Load the model on first use.
+
+    TensorFlow is only imported here, so processes that never run inference
+    locally (API workers in remote inference mode) never pay for it.
+    """
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = _load_model()
+    return _model
+
+
+def limit_model_threads(threads: int) -> None:
+    """Cap the CPU threads the model uses per predict() call.
+
+    Must run before get_model(): TensorFlow only accepts thread pool sizes
+    before its runtime is initialized.
+    """
+    global TFLITE_THREADS
+    TFLITE_THREADS = threads
+    if USE_STUB_MODEL or MODEL_PATH.endswith(".tflite"):
+        return
+
+    import tensorflow as tf
+
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    # Ops of this model run one after another; a single inter-op thread
+    # keeps the total close to `threads`
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+
+def _load_model():
+    if USE_STUB_MODEL:
+        from utils.stub_model import StubModel
+
+        return StubModel(
+            len(CLASS_NAMES), delay=float(os.getenv("FDP_STUB_MODEL_DELAY", "0"))
+        )
+
+    try:
+        if not os.path.exists(MODEL_PATH):
+            raise FileNotFoundError(f"Model file not found at: {MODEL_PATH}")
+        if MODEL_PATH.endswith(".tflite"):
+            return TFLiteModel(MODEL_PATH, num_threads=TFLITE_THREADS)
+
+        from tensorflow.keras.models import load_model
+
+        return load_model(MODEL_PATH)
+    except Exception as e:
+        raise RuntimeError(f"Failed to load model: {str(e)}")
+
+
+def _tflite_interpreter_class():
+    # The standalone LiteRT / tflite_runtime packages are much lighter than
+    # TensorFlow; use whichever is installed before falling back to tf.lite
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+    except ImportError:
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+
+            Interpreter = tf.lite.Interpreter
+    return Interpreter
+
+
+class TFLiteModel:
+    """Keras-like predict() over a TFLite model, for quantized artifacts.
+
+    Interpreters are not thread-safe, so each executor thread gets its own.
+    Integer-quantized inputs/outputs are (de)quantized here so callers keep
+    passing float32 arrays and receiving float scores.
+    """
+
+    def __init__(self, path: str, num_threads: int = 1):
+        self.path = path
+        self.num_threads = num_threads
+        self._local = threading.local()
+        # Fail at load time, not on the first request
+        self._interpreter()
+
+    def _interpreter(self):
+        interpreter = getattr(self._local, "interpreter", None)
+        if interpreter is None:
+            interpreter = _tflite_interpreter_class()(
+                model_path=self.path, num_threads=self.num_threads
+            )
+            interpreter.allocate_tensors()
+            self._local.interpreter = interpreter
+            self._local.batch_size = 1
+        return interpreter
+
+    def predict(self, input_data: np.ndarray, verbose=0) -> np.ndarray:
+        interpreter = self._interpreter()
+        input_detail = interpreter.get_input_details()[0]
+        if len(input_data) != self._local.batch_size:
+            interpreter.resize_tensor_input(
+                input_detail["index"], list(input_data.shape)
+            )
+            interpreter.allocate_tensors()
+            self._local.batch_size = len(input_data)
+            input_detail = interpreter.get_input_details()[0]
+
+        scale, zero_point = input_detail["quantization"]
+        if input_detail["dtype"] != np.float32 and scale:
+            # Clip first: pixels outside the calibrated range would otherwise
+            # wrap around in the integer cast (white becoming black)
+            limits = np.iinfo(input_detail["dtype"])
+            input_data = np.clip(
+                np.round(input_data / scale + zero_point), limits.min, limits.max
+            )
+        interpreter.set_tensor(
+            input_detail["index"], input_data.astype(input_detail["dtype"])
+        )
+        interpreter.invoke()
+
+        output_detail = interpreter.get_output_details()[0]
+        output = interpreter.get_tensor(output_detail["index"])
+        scale, zero_point = output_detail["quantization"]
+        if output_detail["dtype"] != np.float32 and scale:
+            output = (output.astype(np.float32) - zero_point) * scale
+        return output
+
+
+# Peak memory per prediction request, for an upload of R bytes:
+#   R (upload buffer from read_upload, shared by hashing and decoding;
+#     the request body itself is capped at the ASGI layer)
+#   + decoded RGB image: 3 * width * height bytes, at most
+#     3 * MAX_IMAGE_PIXELS (decoded at full size so the model sees the same
+#     pixels it was trained and validated on)
+#   + 224 * 224 * 3 * 4 bytes (float32 model input, ~0.6MB)
+#   + 8R/3 (base64 bytes and the str stored, built only after inference
+#     has finished)
+# tests/test_uploads.py checks the Python-allocated part of this budget.
+def read_imagefile(file_data: bytes) -> Image.Image:
+    img = open_image_checked(file_data)
+    return img.convert("RGB")
+
+
+def preprocess(img: Image.Image) -> np.ndarray:
+    img = img.resize(IMG_SIZE)
+    img_array = np.asarray(img, dtype=np.float32)
+    img_array /= 255.0  # Rescale in place
+    img_array = np.expand_dims(img_array, axis=0)  # Add batch dimension
+    return img_array
+
+
+def predict_image(img_data: bytes) -> tuple[str, float]:
+    with stage_timer("predict", "decode"):
+        img = read_imagefile(img_data)
+    with stage_timer("predict", "preprocess"):
+        input_data = preprocess(img)
+    with stage_timer("predict", "model_predict"):
+        prediction = get_model().predict(input_data)
+    predicted_class = CLASS_NAMES[np.argmax(prediction)]
+    confidence = float(np.max(prediction))
+    return predicted_class, confidence
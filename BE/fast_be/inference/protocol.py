@@ -0,0 +1,87 @@
+import asyncio
+import struct
+from typing import Tuple
+
+# Wire protocol between the API process and the inference server.
+#
+# Every frame is a fixed 10-byte header followed by `length` payload bytes:
+#
+#   magic (4s) | version (B) | kind (B) | length (I, network byte order)
+#
+# Requests:  kind = OP_PREDICT, payload = raw image bytes
+#            kind = OP_PING,    payload = empty
+# Responses: kind = STATUS_OK,    payload = class index (H) + confidence (f)
+#                                           + UTF-8 model version
+#            kind = STATUS_ERROR, payload = HTTP status (H) + UTF-8 detail
+#
+# Connections are persistent; each carries one request/response at a time.
+
+MAGIC = b"FDPI"
+VERSION = 2
+HEADER = struct.Struct("!4sBBI")
+PREDICTION = struct.Struct("!Hf")
+ERROR_STATUS = struct.Struct("!H")
+
+OP_PREDICT = 1
+OP_PING = 2
+
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+
+class ProtocolError(Exception):
+    pass
+
+
+async def read_header(reader: asyncio.StreamReader, max_length: int) -> Tuple[int, int]:
+    """Read and validate one frame header; return (kind, payload length)."""
+    header = await reader.readexactly(HEADER.size)
+    magic, version, kind, length = HEADER.unpack(header)
+    if magic != MAGIC or version != VERSION:
+        raise ProtocolError("Bad frame header")
+    if length > max_length:
+        raise ProtocolError(f"Frame of {length} bytes exceeds {max_length} bytes")
+    return kind, length
+
+
+async def read_frame(
+    reader: asyncio.StreamReader, max_length: int
+) -> Tuple[int, bytes]:
+    kind, length = await read_header(reader, max_length)
+    payload = await reader.readexactly(length) if length else b""
+    return kind, payload
+
+
+def write_frame(writer: asyncio.StreamWriter, kind: int, payload: bytes = b"") -> None:
+    writer.write(HEADER.pack(MAGIC, VERSION, kind, len(payload)))
+    if payload:
+        writer.write(payload)
+
+
+def encode_prediction(class_index: int, confidence: float, model_version: str) -> bytes:
+    return PREDICTION.pack(class_index, confidence) + model_version.encode("utf-8")
+
+
+def decode_prediction(payload: bytes) -> Tuple[int, float, str]:
+    class_index, confidence = PREDICTION.unpack_from(payload)
+    model_version = payload[PREDICTION.size :].decode("utf-8", "replace")
+    return class_index, confidence, model_version
+
+
+def encode_error(status_code: int, detail: str) -> bytes:
+    return ERROR_STATUS.pack(status_code) + detail.encode("utf-8")
+
+
+def decode_error(payload: bytes) -> Tuple[int, str]:
+    (status_code,) = ERROR_STATUS.unpack_from(payload)
+    return status_code, payload[ERROR_STATUS.size :].decode("utf-8", "replace")
+
+
+def parse_address(address: str) -> Tuple[str, str, int]:
+    """Parse ``unix:/path/to.sock`` or ``tcp:host:port`` (``host:port``)."""
+    if address.startswith("unix:"):
+        return "unix", address[len("unix:") :], 0
+    if address.startswith("tcp:"):
+        address = address[len("tcp:") :]
+    host, _, port = address.rpartition(":")
+    return "tcp", host or "127.0.0.1", int(port)
@@ -0,0 +1,236 @@
+"""Post-training quantization of the served model, with a comparison report.
+
+Converts the float32 Keras model to an INT8 (or float16) TFLite artifact
+using a small calibration set, then compares it with the float model on an
+evaluation set (top-1 agreement and confidence drift, overall and per class)
+and benchmarks latency at several batch sizes.
+
+Run from BE/fast_be:
+
+    python -m inference.quantize --calibration-dir data/calibration
+    python -m inference.quantize --calibration-dir data/calibration \\
+        --eval-dir data/eval --mode float16 --batch-sizes 1 8 32
+
+Serve the result with FDP_MODEL_VARIANT=int8 (or float16), or point
+FDP_MODEL_PATH at a custom output path. Run it with the FDP_TFLITE_THREADS
+value the servers use, so the latency figures match serving.
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from inference.model import (
+    CLASS_NAMES,
+    MODEL_DIR,
+    MODEL_VARIANTS,
+    TFLITE_THREADS,
+    TFLiteModel,
+    preprocess,
+    read_imagefile,
+)
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+
+def load_images(directory: str, limit: int) -> np.ndarray:
+    """Load and preprocess up to `limit` images (searched recursively)."""
+    paths = []
+    for root, _, files in os.walk(directory):
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                paths.append(os.path.join(root, name))
+    paths = sorted(paths)[:limit]
+    if not paths:
+        raise SystemExit(f"No images found in {directory}")
+    batches = []
+    for path in paths:
+        with open(path, "rb") as f:
+            batches.append(preprocess(read_imagefile(f.read())))
+    return np.concatenate(batches, axis=0)
+
+
+def convert(keras_model, mode: str, calibration: np.ndarray) -> bytes:
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(keras_model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if mode == "float16":
+        converter.target_spec.supported_types = [tf.float16]
+    else:
+
+        def representative_dataset():
+            for sample in calibration:
+                yield [sample[np.newaxis, ...]]
+
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        # Fully integer graph; TFLiteModel handles (de)quantizing I/O
+        converter.inference_input_type = tf.int8
+        converter.inference_output_type = tf.int8
+    return converter.convert()
+
+
+def predict_batched(model, images: np.ndarray, batch_size: int) -> np.ndarray:
+    outputs = []
+    for start in range(0, len(images), batch_size):
+        outputs.append(
+            np.asarray(model.predict(images[start : start + batch_size], verbose=0))
+        )
+    return np.concatenate(outputs, axis=0)
+
+
+def compare(reference: np.ndarray, candidate: np.ndarray) -> Dict:
+    ref_top1 = reference.argmax(axis=1)
+    cand_top1 = candidate.argmax(axis=1)
+    ref_conf = reference.max(axis=1)
+    # Drift of the confidence the quantized model assigns to the float
+    # model's predicted class
+    drift = np.abs(candidate[np.arange(len(candidate)), ref_top1] - ref_conf)
+
+    per_class = {}
+    for index, name in enumerate(CLASS_NAMES):
+        mask = ref_top1 == index
+        if not mask.any():
+            per_class[name] = {"samples": 0}
+            continue
+        per_class[name] = {
+            "samples": int(mask.sum()),
+            "top1_agreement": float((cand_top1[mask] == index).mean()),
+            "mean_confidence_drift": float(drift[mask].mean()),
+            "max_confidence_drift": float(drift[mask].max()),
+        }
+
+    return {
+        "samples": int(len(reference)),
+        "top1_agreement": float((ref_top1 == cand_top1).mean()),
+        "mean_confidence_drift": float(drift.mean()),
+        "max_confidence_drift": float(drift.max()),
+        "mean_abs_score_diff": float(np.abs(candidate - reference).mean()),
+        "per_class": per_class,
+    }
+
+
+def benchmark(model, images: np.ndarray, batch_sizes: List[int], runs: int) -> Dict:
+    results = {}
+    for batch_size in batch_sizes:
+        batch = np.resize(images, (batch_size,) + images.shape[1:]).astype(np.float32)
+        model.predict(batch, verbose=0)  # warm-up (graph build, tensor resize)
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            model.predict(batch, verbose=0)
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+        results[str(batch_size)] = {
+            "p50_ms": timings[len(timings) // 2] * 1000,
+            "p95_ms": timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1000,
+            "per_image_ms": timings[len(timings) // 2] * 1000 / batch_size,
+        }
+    return results
+
+
+def print_report(report: Dict) -> None:
+    accuracy = report["accuracy"]
+    print(f"\n{report['mode']} vs float32 on {accuracy['samples']} images")
+    print(f"  top-1 agreement:       {accuracy['top1_agreement'] * 100:.2f}%")
+    print(f"  mean confidence drift: {accuracy['mean_confidence_drift']:.4f}")
+    print(f"  max confidence drift:  {accuracy['max_confidence_drift']:.4f}")
+    print(f"\n  {'class':<22} {'n':>5} {'agree%':>8} {'drift':>8}")
+    for name, stats in accuracy["per_class"].items():
+        if not stats["samples"]:
+            print(f"  {name:<22} {0:>5} {'-':>8} {'-':>8}")
+            continue
+        print(
+            f"  {name:<22} {stats['samples']:>5} "
+            f"{stats['top1_agreement'] * 100:>8.2f} "
+            f"{stats['mean_confidence_drift']:>8.4f}"
+        )
+    print(
+        f"\n  {'batch':>5} {'float32 p50ms':>14} {report['mode'] + ' p50ms':>14}"
+        f"  (TFLite threads: {report['tflite_threads']})"
+    )
+    for batch_size, stats in report["latency"]["float32"].items():
+        quantized = report["latency"][report["mode"]][batch_size]
+        print(
+            f"  {batch_size:>5} {stats['p50_ms']:>14.2f} {quantized['p50_ms']:>14.2f}"
+        )
+    sizes = report["model_size_bytes"]
+    print(
+        f"\n  size: {sizes['float32'] / 1e6:.1f}MB -> "
+        f"{sizes[report['mode']] / 1e6:.1f}MB ({report['output_path']})"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quantize the FDP model")
+    parser.add_argument("--mode", choices=["int8", "float16"], default="int8")
+    parser.add_argument(
+        "--model-path", default=os.path.join(MODEL_DIR, MODEL_VARIANTS["float32"])
+    )
+    parser.add_argument("--calibration-dir", required=True)
+    parser.add_argument(
+        "--calibration-size",
+        type=int,
+        default=200,
+        help="Images used for INT8 range calibration",
+    )
+    parser.add_argument(
+        "--eval-dir", help="Images for the comparison (default: calibration set)"
+    )
+    parser.add_argument("--eval-size", type=int, default=500)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--output", help="Quantized artifact path")
+    parser.add_argument("--report", help="Write the comparison report as JSON")
+    args = parser.parse_args()
+
+    from tensorflow.keras.models import load_model
+
+    output_path = args.output or os.path.join(MODEL_DIR, MODEL_VARIANTS[args.mode])
+    keras_model = load_model(args.model_path)
+
+    calibration = load_images(args.calibration_dir, args.calibration_size)
+    print(f"Converting to {args.mode} with {len(calibration)} calibration images")
+    with open(output_path, "wb") as f:
+        f.write(convert(keras_model, args.mode, calibration))
+
+    # Same interpreter threads as serving; the Keras model also runs as it
+    # is served (TensorFlow's default thread pools)
+    quantized_model = TFLiteModel(output_path, num_threads=TFLITE_THREADS)
+    evaluation = (
+        load_images(args.eval_dir, args.eval_size) if args.eval_dir else calibration
+    )
+    eval_batch = max(args.batch_sizes)
+    report = {
+        "mode": args.mode,
+        "output_path": output_path,
+        "tflite_threads": TFLITE_THREADS,
+        "model_size_bytes": {
+            "float32": os.path.getsize(args.model_path),
+            args.mode: os.path.getsize(output_path),
+        },
+        "accuracy": compare(
+            predict_batched(keras_model, evaluation, eval_batch),
+            predict_batched(quantized_model, evaluation, eval_batch),
+        ),
+        "latency": {
+            "float32": benchmark(keras_model, evaluation, args.batch_sizes, args.runs),
+            args.mode: benchmark(
+                quantized_model, evaluation, args.batch_sizes, args.runs
+            ),
+        },
+    }
+
+    print_report(report)
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
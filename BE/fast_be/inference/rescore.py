@@ -0,0 +1,280 @@
+"""Resumable bulk re-scoring of stored scans with the current model.
+
+Streams scan_results in _id order with a Motor cursor, decodes the stored
+images, runs them through the model in large batches and writes the new
+predictions back with bulk_write. Progress is checkpointed in the
+rescore_checkpoints collection after every written batch, so an
+interrupted job picks up where it stopped when rerun with the same --job-id.
+
+Run from BE/fast_be (with the same FDP_MODEL_* settings as the servers):
+
+    python -m inference.rescore
+    python -m inference.rescore --batch-size 128 --workers 2 --pause 0.5
+    python -m inference.rescore --all --job-id full-2026-10 --restart
+
+Only scans whose model_version differs from the current MODEL_VERSION are
+re-scored unless --all is given. --workers bounds both the decoding threads
+and the threads the model computes with, --max-inflight the batches held in
+memory, and --pause sleeps between batches, so the job can share a node with
+live traffic.
+"""
+
+import argparse
+import asyncio
+import base64
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from fastapi import HTTPException
+from pymongo import UpdateOne
+from pymongo.errors import CursorNotFound
+
+from config.database import db
+from inference.model import (
+    CLASS_NAMES,
+    MODEL_VERSION,
+    get_model,
+    limit_model_threads,
+    preprocess,
+    read_imagefile,
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def decode_scan(image_base64: str) -> Optional[np.ndarray]:
+    """Decode one stored image into a (224, 224, 3) float array, or None."""
+    try:
+        return preprocess(read_imagefile(base64.b64decode(image_base64)))[0]
+    except (HTTPException, ValueError, OSError) as e:
+        detail = e.detail if isinstance(e, HTTPException) else str(e)
+        logger.warning(f"Skipping undecodable scan: {detail}")
+        return None
+
+
+class RescoreJob:
+    def __init__(
+        self,
+        job_id: str,
+        batch_size: int,
+        workers: int,
+        pause: float,
+        rescore_all: bool,
+        max_inflight: int,
+    ):
+        self.job_id = job_id
+        self.batch_size = batch_size
+        self.pause = pause
+        self.rescore_all = rescore_all
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        # Batches read ahead from Mongo while the current one is scored
+        self.batches: asyncio.Queue = asyncio.Queue(maxsize=max_inflight)
+        self.processed = 0
+        self.updated = 0
+        self.failed = 0
+        self.last_id = None
+
+    async def load_checkpoint(self, restart: bool) -> None:
+        if restart:
+            await db.rescore_checkpoints.delete_one({"_id": self.job_id})
+            return
+        checkpoint = await db.rescore_checkpoints.find_one({"_id": self.job_id})
+        if checkpoint:
+            self.last_id = checkpoint["last_id"]
+            self.processed = checkpoint.get("processed", 0)
+            self.updated = checkpoint.get("updated", 0)
+            self.failed = checkpoint.get("failed", 0)
+            logger.info(
+                f"Resuming job {self.job_id} after _id {self.last_id} "
+                f"({self.processed} scans already processed)"
+            )
+
+    async def save_checkpoint(self, done: bool = False) -> None:
+        await db.rescore_checkpoints.update_one(
+            {"_id": self.job_id},
+            {
+                "$set": {
+                    "last_id": self.last_id,
+                    "processed": self.processed,
+                    "updated": self.updated,
+                    "failed": self.failed,
+                    "model_version": MODEL_VERSION,
+                    "done": done,
+                    "updated_at": datetime.utcnow(),
+                }
+            },
+            upsert=True,
+        )
+
+    def _query(self, after_id) -> Dict[str, Any]:
+        query: Dict[str, Any] = {}
+        if after_id is not None:
+            query["_id"] = {"$gt": after_id}
+        if not self.rescore_all:
+            query["model_version"] = {"$ne": MODEL_VERSION}
+        return query
+
+    async def read_batches(self) -> None:
+        """Producer: stream scans in _id order and queue them in batches.
+
+        Ends with None, or with the exception that stopped it so the
+        consumer fails instead of waiting forever.
+        """
+        try:
+            await self._read_batches()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await self.batches.put(e)
+            return
+        await self.batches.put(None)
+
+    async def _read_batches(self) -> None:
+        resume_after = self.last_id
+        while True:
+            query = self._query(resume_after)
+            cursor = (
+                db.scan_results.find(query, {"image_base64": 1})
+                .sort("_id", 1)
+                .batch_size(self.batch_size)
+            )
+            batch: List[Dict[str, Any]] = []
+            try:
+                async for doc in cursor:
+                    batch.append(doc)
+                    if len(batch) >= self.batch_size:
+                        await self.batches.put(batch)
+                        resume_after = batch[-1]["_id"]
+                        batch = []
+            except CursorNotFound:
+                # Server reaped the cursor during a long pause; reopen it
+                # after the last queued batch
+                logger.warning("Cursor expired, reopening")
+                continue
+            if batch:
+                await self.batches.put(batch)
+            break
+
+    def _score(self, docs: List[Dict[str, Any]]):
+        arrays = list(
+            self.executor.map(lambda d: decode_scan(d.get("image_base64") or ""), docs)
+        )
+        valid = [(doc, arr) for doc, arr in zip(docs, arrays) if arr is not None]
+        if not valid:
+            return [], len(docs)
+        inputs = np.stack([arr for _, arr in valid])
+        predictions = np.asarray(get_model().predict(inputs, verbose=0))
+        results = [
+            (doc["_id"], CLASS_NAMES[int(row.argmax())], float(row.max()))
+            for (doc, _), row in zip(valid, predictions)
+        ]
+        return results, len(docs) - len(valid)
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        producer = asyncio.create_task(self.read_batches())
+        start = time.perf_counter()
+        try:
+            while True:
+                docs = await self.batches.get()
+                if docs is None:
+                    break
+                if isinstance(docs, Exception):
+                    raise docs
+                results, failed = await loop.run_in_executor(None, self._score, docs)
+                if results:
+                    now = datetime.utcnow()
+                    write = await db.scan_results.bulk_write(
+                        [
+                            UpdateOne(
+                                {"_id": scan_id},
+                                {
+                                    "$set": {
+                                        "result": result,
+                                        "confidence": confidence,
+                                        "model_version": MODEL_VERSION,
+                                        "rescored_at": now,
+                                    }
+                                },
+                            )
+                            for scan_id, result, confidence in results
+                        ],
+                        ordered=False,
+                    )
+                    self.updated += write.modified_count
+                self.processed += len(docs)
+                self.failed += failed
+                self.last_id = docs[-1]["_id"]
+                await self.save_checkpoint()
+
+                elapsed = time.perf_counter() - start
+                logger.info(
+                    f"Re-scored {self.processed} scans "
+                    f"({self.updated} updated, {self.failed} failed, "
+                    f"{self.processed / elapsed:.1f}/s overall)"
+                )
+                if self.pause:
+                    await asyncio.sleep(self.pause)
+        finally:
+            producer.cancel()
+        await self.save_checkpoint(done=True)
+        logger.info(
+            f"Job {self.job_id} finished: {self.processed} processed, "
+            f"{self.updated} updated, {self.failed} failed"
+        )
+
+
+async def main_async(args) -> None:
+    job = RescoreJob(
+        job_id=args.job_id or f"rescore-{MODEL_VERSION}",
+        batch_size=args.batch_size,
+        workers=args.workers,
+        pause=args.pause,
+        rescore_all=args.all,
+        max_inflight=args.max_inflight,
+    )
+    await job.load_checkpoint(args.restart)
+    # TensorFlow would otherwise use every core for predict()
+    limit_model_threads(args.workers)
+    # Load before streaming so a bad model fails before any work is done
+    get_model()
+    await job.run()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-score stored scans")
+    parser.add_argument(
+        "--job-id", help="Checkpoint key (default: rescore-<MODEL_VERSION>)"
+    )
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=2,
+        help="Threads used to decode images, and by the model per batch",
+    )
+    parser.add_argument(
+        "--max-inflight", type=int, default=2, help="Batches read ahead from Mongo"
+    )
+    parser.add_argument(
+        "--pause", type=float, default=0.0, help="Seconds to sleep between batches"
+    )
+    parser.add_argument(
+        "--all",
+        action="store_true",
+        help="Re-score every scan, not only those from other model versions",
+    )
+    parser.add_argument(
+        "--restart", action="store_true", help="Ignore any saved checkpoint"
+    )
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Standalone inference server.
+
+Loads the model once and answers predictions from API workers running with
+INFERENCE_MODE=remote (see inference/client.py and inference/protocol.py).
+
+Run from BE/fast_be:
+
+    python -m inference.server --address unix:/tmp/fdp-inference.sock
+    python -m inference.server --address tcp:127.0.0.1:9100 --threads 4
+
+Several servers may listen on the same TCP port (SO_REUSEPORT) or on
+separate sockets listed in INFERENCE_ADDRESS to scale model processes
+independently of API workers.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+
+from inference import model as inference_model
+from inference.protocol import (
+    OP_PING,
+    OP_PREDICT,
+    STATUS_ERROR,
+    STATUS_OK,
+    ProtocolError,
+    encode_error,
+    encode_prediction,
+    parse_address,
+    read_frame,
+    write_frame,
+)
+from utils.uploads import MAX_UPLOAD_BYTES
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class InferenceServer:
+    def __init__(self, address: str, threads: int):
+        self.address = address
+        self.executor = ThreadPoolExecutor(max_workers=threads)
+
+    async def handle_connection(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                try:
+                    kind, payload = await read_frame(reader, MAX_UPLOAD_BYTES)
+                except asyncio.IncompleteReadError:
+                    break  # client closed the connection
+
+                if kind == OP_PING:
+                    write_frame(writer, STATUS_OK)
+                elif kind == OP_PREDICT:
+                    try:
+                        predicted_class, confidence = await loop.run_in_executor(
+                            self.executor, inference_model.predict_image, payload
+                        )
+                        class_index = inference_model.CLASS_NAMES.index(predicted_class)
+                        write_frame(
+                            writer,
+                            STATUS_OK,
+                            encode_prediction(
+                                class_index, confidence, inference_model.MODEL_VERSION
+                            ),
+                        )
+                    except HTTPException as e:
+                        write_frame(
+                            writer,
+                            STATUS_ERROR,
+                            encode_error(e.status_code, str(e.detail)),
+                        )
+                    except Exception as e:
+                        logger.error(f"Inference failed: {str(e)}")
+                        write_frame(writer, STATUS_ERROR, encode_error(500, str(e)))
+                else:
+                    raise ProtocolError(f"Unknown opcode {kind}")
+                await writer.drain()
+        except (ProtocolError, ConnectionError) as e:
+            logger.warning(f"Dropping inference connection: {str(e)}")
+        finally:
+            writer.close()
+
+    async def _remove_stale_socket(self, path: str) -> None:
+        # A socket file left by a crashed server refuses connections; one
+        # that accepts belongs to a live server we must not take over from
+        try:
+            _, writer = await asyncio.open_unix_connection(path)
+        except OSError:
+            os.remove(path)
+            return
+        writer.close()
+        raise RuntimeError(f"Another inference server is listening on {path}")
+
+    async def serve(self):
+        scheme, host_or_path, port = parse_address(self.address)
+        if scheme == "unix" and os.path.exists(host_or_path):
+            await self._remove_stale_socket(host_or_path)
+        # Load before accepting connections so the first request is not slow
+        inference_model.get_model()
+        if scheme == "unix":
+            server = await asyncio.start_unix_server(
+                self.handle_connection, path=host_or_path
+            )
+        else:
+            server = await asyncio.start_server(
+                self.handle_connection, host=host_or_path, port=port, reuse_port=True
+            )
+        logger.info(f"Inference server listening on {self.address}")
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FDP inference server")
+    parser.add_argument(
+        "--address",
+        default=os.getenv("INFERENCE_ADDRESS", "unix:/tmp/fdp-inference.sock"),
+        help="unix:/path/to.sock or tcp:host:port",
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=int(os.getenv("INFERENCE_THREADS", str(os.cpu_count() or 1))),
+        help="Concurrent model.predict calls",
+    )
+    args = parser.parse_args()
+    asyncio.run(InferenceServer(args.address.split(",")[0], args.threads).serve())
+
+
+if __name__ == "__main__":
+    main()
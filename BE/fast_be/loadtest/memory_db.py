@@ -0,0 +1,311 @@
+import copy
+import re
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+from bson.objectid import ObjectId
+
+# In-memory, Motor-compatible stand-in for the subset of the driver API the
+# app uses. It is good enough to drive load tests on a box without MongoDB;
+# it is not a general-purpose Mongo emulator.
+
+
+def _get_path(doc: Dict[str, Any], path: str) -> Any:
+    value: Any = doc
+    for part in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def _match_value(value: Any, condition: Any) -> bool:
+    if isinstance(condition, dict) and any(k.startswith("$") for k in condition):
+        for op, arg in condition.items():
+            if op == "$regex":
+                flags = re.IGNORECASE if "i" in condition.get("$options", "") else 0
+                if not isinstance(value, str) or not re.search(arg, value, flags):
+                    return False
+            elif op == "$options":
+                continue
+            elif op == "$in":
+                if value not in arg:
+                    return False
+            elif op == "$ne":
+                if value == arg:
+                    return False
+            elif op == "$exists":
+                if (value is not None) != bool(arg):
+                    return False
+            elif op == "$gt":
+                if value is None or not value > arg:
+                    return False
+            elif op == "$gte":
+                if value is None or not value >= arg:
+                    return False
+            elif op == "$lt":
+                if value is None or not value < arg:
+                    return False
+            elif op == "$lte":
+                if value is None or not value <= arg:
+                    return False
+            else:
+                raise NotImplementedError(f"Query operator {op} is not supported")
+        return True
+    return value == condition
+
+
+def matches(doc: Dict[str, Any], query: Dict[str, Any]) -> bool:
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(matches(doc, sub) for sub in condition):
+                return False
+        elif key == "$and":
+            if not all(matches(doc, sub) for sub in condition):
+                return False
+        elif not _match_value(_get_path(doc, key), condition):
+            return False
+    return True
+
+
+def _sort_key(value: Any):
+    # None sorts first, as in Mongo
+    return (value is not None, value)
+
+
+def _sort(docs: List[Dict[str, Any]], spec) -> List[Dict[str, Any]]:
+    items = spec.items() if isinstance(spec, dict) else spec
+    for key, direction in reversed(list(items)):
+        docs = sorted(
+            docs, key=lambda d: _sort_key(_get_path(d, key)), reverse=direction < 0
+        )
+    return docs
+
+
+def _evaluate(doc: Dict[str, Any], expr: Any) -> Any:
+    if isinstance(expr, str) and expr.startswith("$"):
+        return _get_path(doc, expr[1:])
+    if isinstance(expr, dict):
+        if "$dateToString" in expr:
+            date = _evaluate(doc, expr["$dateToString"]["date"])
+            return date.strftime(expr["$dateToString"]["format"])
+        if "$dayOfWeek" in expr:
+            date: datetime = _evaluate(doc, expr["$dayOfWeek"])
+            # Mongo: 1 = Sunday ... 7 = Saturday
+            return (date.weekday() + 1) % 7 + 1
+        return {key: _evaluate(doc, value) for key, value in expr.items()}
+    return expr
+
+
+def _group(docs, spec):
+    groups: Dict[Any, Dict[str, Any]] = {}
+    for doc in docs:
+        key = _evaluate(doc, spec["_id"])
+        hashable = repr(key)
+        group = groups.setdefault(hashable, {"_id": key})
+        for field, accumulator in spec.items():
+            if field == "_id":
+                continue
+            op, arg = next(iter(accumulator.items()))
+            if op == "$sum":
+                group[field] = group.get(field, 0) + _evaluate(doc, arg)
+            elif op == "$max":
+                value = _evaluate(doc, arg)
+                if value is not None and (
+                    group.get(field) is None or value > group[field]
+                ):
+                    group[field] = value
+            elif op == "$push":
+                group.setdefault(field, []).append(_evaluate(doc, arg))
+            else:
+                raise NotImplementedError(f"Accumulator {op} is not supported")
+    return list(groups.values())
+
+
+def _bucket(docs, spec):
+    boundaries = spec["boundaries"]
+    buckets: Dict[Any, Dict[str, Any]] = {}
+    for doc in docs:
+        value = _evaluate(doc, spec["groupBy"])
+        bucket_id = spec.get("default")
+        for lower, upper in zip(boundaries, boundaries[1:]):
+            if value is not None and lower <= value < upper:
+                bucket_id = lower
+                break
+        buckets.setdefault(bucket_id, []).append(doc)
+    output = spec.get("output", {"count": {"$sum": 1}})
+    results = _group(
+        [
+            dict(doc, __bucket=bucket_id)
+            for bucket_id, ds in buckets.items()
+            for doc in ds
+        ],
+        {"_id": "$__bucket", **output},
+    )
+    order = {b: i for i, b in enumerate(boundaries)}
+    return sorted(results, key=lambda r: order.get(r["_id"], len(order)))
+
+
+def aggregate(docs: List[Dict[str, Any]], pipeline: List[Dict[str, Any]]):
+    for stage in pipeline:
+        op, spec = next(iter(stage.items()))
+        if op == "$match":
+            docs = [d for d in docs if matches(d, spec)]
+        elif op == "$group":
+            docs = _group(docs, spec)
+        elif op == "$sort":
+            docs = _sort(docs, spec)
+        elif op == "$bucket":
+            docs = _bucket(docs, spec)
+        elif op == "$skip":
+            docs = docs[spec:]
+        elif op == "$limit":
+            docs = docs[:spec]
+        else:
+            raise NotImplementedError(f"Pipeline stage {op} is not supported")
+    return docs
+
+
+class MemoryCursor:
+    def __init__(self, docs: List[Dict[str, Any]]):
+        self._docs = docs
+        self._sort = None
+        self._skip = 0
+        self._limit = 0
+        self._iter = None
+
+    def sort(self, key, direction=None):
+        self._sort = [(key, direction or 1)] if isinstance(key, str) else key
+        return self
+
+    def skip(self, n: int):
+        self._skip = n
+        return self
+
+    def limit(self, n: int):
+        self._limit = n
+        return self
+
+    def batch_size(self, n: int):
+        return self
+
+    def _results(self) -> List[Dict[str, Any]]:
+        docs = self._docs
+        if self._sort:
+            docs = _sort(docs, self._sort)
+        docs = docs[self._skip :]
+        if self._limit:
+            docs = docs[: self._limit]
+        return [copy.deepcopy(d) for d in docs]
+
+    async def to_list(self, length: Optional[int] = None):
+        docs = self._results()
+        return docs if length is None else docs[:length]
+
+    def __aiter__(self):
+        self._iter = iter(self._results())
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class MemoryCollection:
+    def __init__(self, name: str):
+        self.name = name
+        self._docs: List[Dict[str, Any]] = []
+
+    async def insert_one(self, document: Dict[str, Any]):
+        document.setdefault("_id", ObjectId())
+        self._docs.append(copy.deepcopy(document))
+        return SimpleNamespace(inserted_id=document["_id"])
+
+    async def insert_many(self, documents, ordered: bool = True):
+        ids = []
+        for document in documents:
+            ids.append((await self.insert_one(document)).inserted_id)
+        return SimpleNamespace(inserted_ids=ids)
+
+    async def find_one(self, query: Optional[Dict[str, Any]] = None, *args, **kwargs):
+        for doc in self._docs:
+            if matches(doc, query or {}):
+                return copy.deepcopy(doc)
+        return None
+
+    def find(self, query: Optional[Dict[str, Any]] = None, *args, **kwargs):
+        return MemoryCursor([d for d in self._docs if matches(d, query or {})])
+
+    async def count_documents(self, query: Dict[str, Any]):
+        return sum(1 for d in self._docs if matches(d, query))
+
+    def _apply_update(self, doc: Dict[str, Any], update: Dict[str, Any]) -> None:
+        for op, fields in update.items():
+            if op == "$set":
+                doc.update(copy.deepcopy(fields))
+            elif op == "$unset":
+                for field in fields:
+                    doc.pop(field, None)
+            elif op == "$inc":
+                for field, amount in fields.items():
+                    doc[field] = doc.get(field, 0) + amount
+            else:
+                raise NotImplementedError(f"Update operator {op} is not supported")
+
+    async def update_one(self, query, update, upsert: bool = False):
+        for doc in self._docs:
+            if matches(doc, query):
+                self._apply_update(doc, update)
+                return SimpleNamespace(matched_count=1, modified_count=1)
+        if upsert:
+            doc = {k: v for k, v in query.items() if not k.startswith("$")}
+            self._apply_update(doc, update)
+            await self.insert_one(doc)
+        return SimpleNamespace(matched_count=0, modified_count=0)
+
+    async def find_one_and_update(self, query, update, return_document=False, **kwargs):
+        for doc in self._docs:
+            if matches(doc, query):
+                before = copy.deepcopy(doc)
+                self._apply_update(doc, update)
+                return copy.deepcopy(doc) if return_document else before
+        return None
+
+    async def delete_one(self, query):
+        for i, doc in enumerate(self._docs):
+            if matches(doc, query):
+                del self._docs[i]
+                return SimpleNamespace(deleted_count=1)
+        return SimpleNamespace(deleted_count=0)
+
+    def aggregate(self, pipeline: List[Dict[str, Any]]):
+        return MemoryCursor(aggregate(list(self._docs), pipeline))
+
+
+class MemoryDatabase:
+    def __init__(self):
+        self._collections: Dict[str, MemoryCollection] = {}
+
+    def __getattr__(self, name: str) -> MemoryCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        if name not in self._collections:
+            self._collections[name] = MemoryCollection(name)
+        return self._collections[name]
+
+
+class MemoryClient:
+    def __init__(self):
+        self._databases: Dict[str, MemoryDatabase] = {}
+
+    def __getitem__(self, name: str) -> MemoryDatabase:
+        return self._databases.setdefault(name, MemoryDatabase())
+
+    async def server_info(self):
+        return {"version": "in-memory"}
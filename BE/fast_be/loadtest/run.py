@@ -0,0 +1,387 @@
+"""Mixed-workload load generator for the FastAPI backend.
+
+Drives main.app in-process (or a running server via --base-url) with the
+operation mix from a scenario file and reports throughput, p50/p95/p99
+latency and error rate per endpoint.
+
+Run from BE/fast_be (requires httpx):
+
+    python -m loadtest.run --memory-db --stub-model
+    python -m loadtest.run --scenario loadtest/scenario.json --json report.json
+    python -m loadtest.run --base-url http://localhost:8000
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import time
+import uuid
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+DEFAULT_SCENARIO = os.path.join(os.path.dirname(__file__), "scenario.json")
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(
+        len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1)))
+    )
+    return sorted_values[index]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    async def call(
+        self, client: httpx.AsyncClient, name: str, method: str, url: str, **kwargs
+    ):
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            response, ok = None, False
+        self.latencies[name].append(time.perf_counter() - start)
+        if not ok:
+            self.errors[name] += 1
+        return response if ok else None
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        endpoints = {}
+        for name in sorted(self.latencies):
+            values = sorted(self.latencies[name])
+            endpoints[name] = {
+                "requests": len(values),
+                "throughput_rps": len(values) / elapsed,
+                "p50_ms": percentile(values, 50) * 1000,
+                "p95_ms": percentile(values, 95) * 1000,
+                "p99_ms": percentile(values, 99) * 1000,
+                "error_rate": self.errors[name] / len(values),
+            }
+        total = sum(len(v) for v in self.latencies.values())
+        return {
+            "elapsed_seconds": elapsed,
+            "total_requests": total,
+            "total_throughput_rps": total / elapsed if elapsed else 0.0,
+            "endpoints": endpoints,
+        }
+
+
+class Workload:
+    """Shared state plus one coroutine per operation in the scenario mix."""
+
+    def __init__(
+        self, client: httpx.AsyncClient, recorder: Recorder, scenario: Dict[str, Any]
+    ):
+        self.client = client
+        self.recorder = recorder
+        self.scenario = scenario
+        self.users: List[Dict[str, str]] = []
+        self.doctors: List[Dict[str, str]] = []
+        self.scan_image = self._make_scan_image(
+            scenario.get("scan_image_size", [640, 480])
+        )
+
+    @staticmethod
+    def _make_scan_image(size) -> bytes:
+        from PIL import Image
+
+        buf = io.BytesIO()
+        Image.effect_noise(tuple(size), 40).convert("RGB").save(buf, "JPEG", quality=85)
+        return buf.getvalue()
+
+    async def _register(self, role: str) -> Optional[Dict[str, str]]:
+        uid = uuid.uuid4().hex
+        account = {
+            "username": f"{role}-{uid[:8]}",
+            "email": f"{uid}@loadtest.example.com",
+            "role": role,
+            "firebase_uid": uid,
+        }
+        if role == "doctor":
+            account["doctor_reg_no"] = f"REG-{uid[:6]}"
+        response = await self.recorder.call(
+            self.client, "POST /auth/register", "POST", "/auth/register", json=account
+        )
+        if response is None:
+            return None
+        await self.recorder.call(
+            self.client,
+            "PUT /auth/user/{firebase_uid}",
+            "PUT",
+            f"/auth/user/{uid}",
+            json={
+                "first_name": random.choice(["Ann", "Ben", "Chen", "Dara", "Eli"]),
+                "last_name": random.choice(["Perera", "Silva", "Fernando", "Jay"]),
+                "specialization": "Dermatology" if role == "doctor" else None,
+            },
+        )
+        return {"firebase_uid": uid, "name": account["username"]}
+
+    async def seed(self) -> None:
+        for _ in range(self.scenario.get("seed_doctors", 10)):
+            doctor = await self._register("doctor")
+            if doctor:
+                self.doctors.append(doctor)
+        for _ in range(self.scenario.get("seed_users", 50)):
+            user = await self._register("user")
+            if user:
+                self.users.append(user)
+        if not self.users or not self.doctors:
+            raise RuntimeError(
+                "Seeding failed: no users or doctors could be registered"
+            )
+
+    async def register_user(self):
+        user = await self._register("user")
+        if user:
+            self.users.append(user)
+
+    async def get_profile(self):
+        user = random.choice(self.users)
+        await self.recorder.call(
+            self.client,
+            "GET /auth/user/{firebase_uid}",
+            "GET",
+            f"/auth/user/{user['firebase_uid']}",
+        )
+
+    async def search_doctors(self):
+        await self.recorder.call(
+            self.client,
+            "GET /auth/search/doctors",
+            "GET",
+            "/auth/search/doctors",
+            params={
+                "q": random.choice(["", "derm", "a", "silva"]),
+                "page": 1,
+                "limit": 5,
+            },
+        )
+
+    async def book_appointment(self):
+        user, doctor = random.choice(self.users), random.choice(self.doctors)
+        await self.recorder.call(
+            self.client,
+            "POST /api/appointments/",
+            "POST",
+            "/api/appointments/",
+            json={
+                "user_id": user["firebase_uid"],
+                "user_name": user["name"],
+                "doctor_id": doctor["firebase_uid"],
+                "doctor_name": doctor["name"],
+                "date": f"2026-{random.randint(1, 12):02d}-{random.randint(1, 28):02d}",
+                "time": f"{random.randint(8, 17):02d}:00",
+            },
+        )
+
+    async def list_appointments(self):
+        if random.random() < 0.5:
+            user = random.choice(self.users)
+            await self.recorder.call(
+                self.client,
+                "GET /api/appointments/user/{user_id}",
+                "GET",
+                f"/api/appointments/user/{user['firebase_uid']}",
+            )
+        else:
+            doctor = random.choice(self.doctors)
+            await self.recorder.call(
+                self.client,
+                "GET /api/appointments/doctor/{doctor_id}",
+                "GET",
+                f"/api/appointments/doctor/{doctor['firebase_uid']}",
+            )
+
+    async def open_chat_room(self):
+        user, doctor = random.choice(self.users), random.choice(self.doctors)
+        await self.recorder.call(
+            self.client,
+            "POST /chat/room",
+            "POST",
+            "/chat/room",
+            json={
+                "user_id": user["firebase_uid"],
+                "doctor_id": doctor["firebase_uid"],
+                "user_name": user["name"],
+                "doctor_name": doctor["name"],
+            },
+        )
+
+    async def list_chat_rooms(self):
+        user = random.choice(self.users)
+        await self.recorder.call(
+            self.client,
+            "GET /chat/rooms/{firebase_uid}",
+            "GET",
+            f"/chat/rooms/{user['firebase_uid']}",
+        )
+
+    async def upload_scan(self):
+        user = random.choice(self.users)
+        await self.recorder.call(
+            self.client,
+            "POST /api/predict/",
+            "POST",
+            "/api/predict/",
+            files={"file": ("scan.jpg", self.scan_image, "image/jpeg")},
+            data={"user_id": user["firebase_uid"]},
+        )
+
+    async def scan_history(self):
+        user = random.choice(self.users)
+        await self.recorder.call(
+            self.client,
+            "GET /api/predict/history/{user_id}",
+            "GET",
+            f"/api/predict/history/{user['firebase_uid']}",
+            params={"page": 1, "limit": 10},
+        )
+
+    async def stats_dashboard(self):
+        # The dashboard loads all four stats views at once
+        user = random.choice(self.users)
+        await asyncio.gather(
+            *(
+                self.recorder.call(
+                    self.client,
+                    f"GET /api/predict/stats/{{user_id}}/{view}",
+                    "GET",
+                    f"/api/predict/stats/{user['firebase_uid']}/{view}",
+                )
+                for view in (
+                    "condition-frequency",
+                    "condition-distribution",
+                    "scan-frequency-by-day",
+                    "condition-by-confidence",
+                )
+            )
+        )
+
+
+async def run_scenario(
+    scenario: Dict[str, Any], client: httpx.AsyncClient
+) -> Dict[str, Any]:
+    recorder = Recorder()
+    workload = Workload(client, recorder, scenario)
+    await workload.seed()
+    # Seeding traffic is not part of the measured run
+    recorder = workload.recorder = Recorder()
+
+    operations = list(scenario["mix"].keys())
+    weights = [scenario["mix"][name] for name in operations]
+    deadline = time.perf_counter() + scenario.get("duration_seconds", 30)
+
+    async def virtual_user():
+        while time.perf_counter() < deadline:
+            name = random.choices(operations, weights)[0]
+            await getattr(workload, name)()
+
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(virtual_user() for _ in range(scenario.get("concurrency", 10)))
+    )
+    return recorder.report(time.perf_counter() - start)
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    header = f"{'endpoint':<56} {'reqs':>7} {'rps':>8} {'p50ms':>8} {'p95ms':>8} {'p99ms':>8} {'err%':>6}"
+    print(header)
+    print("-" * len(header))
+    for name, stats in report["endpoints"].items():
+        print(
+            f"{name:<56} {stats['requests']:>7} {stats['throughput_rps']:>8.1f} "
+            f"{stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f} "
+            f"{stats['error_rate'] * 100:>6.2f}"
+        )
+    print("-" * len(header))
+    print(
+        f"total: {report['total_requests']} requests in {report['elapsed_seconds']:.1f}s "
+        f"({report['total_throughput_rps']:.1f} req/s)"
+    )
+
+
+def build_app(memory_db: bool):
+    if memory_db:
+        # Swap the Motor client/database before any route module imports them
+        import config.database as database
+        from loadtest.memory_db import MemoryClient
+
+        database.client = MemoryClient()
+        database.db = database.client["fdpDB"]
+    from main import app
+
+    return app
+
+
+async def main_async(args) -> Dict[str, Any]:
+    with open(args.scenario) as f:
+        scenario = json.load(f)
+    if args.duration is not None:
+        scenario["duration_seconds"] = args.duration
+    if args.concurrency is not None:
+        scenario["concurrency"] = args.concurrency
+
+    if args.base_url:
+        async with httpx.AsyncClient(base_url=args.base_url, timeout=60) as client:
+            return await run_scenario(scenario, client)
+
+    app = build_app(args.memory_db)
+    await app.router.startup()
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://loadtest", timeout=60
+        ) as client:
+            return await run_scenario(scenario, client)
+    finally:
+        await app.router.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--scenario", default=DEFAULT_SCENARIO)
+    parser.add_argument(
+        "--base-url", help="Target a running server instead of main.app"
+    )
+    parser.add_argument(
+        "--memory-db",
+        action="store_true",
+        help="Use the in-memory Motor stand-in instead of MONGO_URI",
+    )
+    parser.add_argument(
+        "--stub-model",
+        action="store_true",
+        help="Serve predictions from the stub model (no TensorFlow needed)",
+    )
+    parser.add_argument("--duration", type=float, help="Override duration_seconds")
+    parser.add_argument("--concurrency", type=int, help="Override concurrency")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    if args.stub_model:
+        os.environ["FDP_STUB_MODEL"] = "1"
+    # All in-process traffic shares one client IP; measure the app, not the limiter
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+
+    report = asyncio.run(main_async(args))
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
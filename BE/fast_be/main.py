@@ -7,6 +7,10 @@ from auth.auth import router
 from auth.chat import router as chat_router
 from routes.appointments import router as appointments_router
 from routes import predict
+from routes.metrics import router as metrics_router
+from utils.compression import CompressionMiddleware
+from utils.metrics import MetricsMiddleware
+from utils.uploads import UploadLimitMiddleware
 
 app = FastAPI()
 
@@ -15,7 +19,10 @@ app.include_router(router, prefix="/auth")
 app.include_router(chat_router)
 app.include_router(appointments_router)
 app.include_router(predict.router)
+app.include_router(metrics_router)
 
+# Innermost, so oversized-upload 413s still get CORS headers and metrics
+app.add_middleware(UploadLimitMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -23,6 +30,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 
 # Custom JSON encoder for ObjectId
@@ -36,6 +45,15 @@ def custom_json_encoder(obj):
 @app.on_event("startup")
 async def startup_event():
     await test_connection()
+    if predict.scan_results_writer is not None:
+        await predict.scan_results_writer.start()
+
+
+# Flush buffered scan results on shutdown
+@app.on_event("shutdown")
+async def shutdown_event():
+    if predict.scan_results_writer is not None:
+        await predict.scan_results_writer.stop()
 
 
 # Test endpoint
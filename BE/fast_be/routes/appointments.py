@@ -1,9 +1,10 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from datetime import datetime
 from typing import List
 from bson.objectid import ObjectId
 from config.database import db
+from utils.rate_limit import read_rate_limit
 from fastapi.encoders import jsonable_encoder
 
 router = APIRouter(prefix="/api/appointments", tags=["appointments"])
@@ -54,7 +55,11 @@ async def create_appointment(appointment: AppointmentCreate):
 
 
 # Get appointments for a doctor
-@router.get("/doctor/{doctor_id}", response_model=List[AppointmentResponse])
+@router.get(
+    "/doctor/{doctor_id}",
+    response_model=List[AppointmentResponse],
+    dependencies=[Depends(read_rate_limit)],
+)
 async def get_appointments_for_doctor(doctor_id: str):
     try:
         appointments = await db.appointments.find({"doctor_id": doctor_id}).to_list(
@@ -91,7 +96,11 @@ async def update_appointment(appointment_id: str, update: AppointmentUpdate):
 
 
 # Get appointments for a user (new path to avoid conflict)
-@router.get("/user/{user_id}", response_model=List[AppointmentResponse])
+@router.get(
+    "/user/{user_id}",
+    response_model=List[AppointmentResponse],
+    dependencies=[Depends(read_rate_limit)],
+)
 async def get_appointments_by_user(user_id: str):
     try:
         appointments = await db.appointments.find({"user_id": user_id}).to_list(
@@ -1,18 +1,29 @@
-from fastapi import APIRouter, File, UploadFile, HTTPException, Depends, Form
+from fastapi import (
+    APIRouter,
+    File,
+    UploadFile,
+    HTTPException,
+    Depends,
+    Form,
+    Request,
+    Response,
+)
 from fastapi.responses import JSONResponse
-from tensorflow.keras.models import load_model
 import os
-from tensorflow.keras.preprocessing import image
-import numpy as np
-from PIL import Image
-import io
 import base64
+import hashlib
 from datetime import datetime
 from pymongo.collection import Collection
 from typing import List, Dict, Any
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
-from config.database import get_db
+from config.database import db as default_db, get_db
+from inference.model import MODEL_VERSION, get_model, predict_image
+from utils.http_cache import cache_headers, etag_matches, make_etag, not_modified
+from utils.metrics import stage_timer
+from utils.rate_limit import inference_rate_limit, read_rate_limit
+from utils.uploads import read_upload
+from utils.write_behind import WRITE_BEHIND_ENABLED, WriteBehindQueue
 import logging
 
 # Set up logging
@@ -24,53 +35,27 @@ router = APIRouter(prefix="/api/predict", tags=["predict"])
 # Thread pool for synchronous tasks
 executor = ThreadPoolExecutor()
 
-# Define the absolute path to the model file
-MODEL_PATH = os.path.join(
-    os.path.dirname(__file__), "..", "face_disease_mobilenetv2_v2.h5"
+# Optional write-behind queue for scan results (see utils/write_behind.py)
+scan_results_writer = (
+    WriteBehindQueue(default_db.scan_results) if WRITE_BEHIND_ENABLED else None
 )
 
-# Load the trained model
-try:
-    if not os.path.exists(MODEL_PATH):
-        raise FileNotFoundError(f"Model file not found at: {MODEL_PATH}")
-    model = load_model(MODEL_PATH)
-except Exception as e:
-    raise RuntimeError(f"Failed to load model: {str(e)}")
-
-# Define class labels
-CLASS_NAMES = [
-    "Actinic Keratosis",
-    "Basal Cell Carcinoma",
-    "Eczemaa",
-    "Rosacea",
-    "Acne",
-]
-
-IMG_SIZE = (224, 224)
-
-
-def read_imagefile(file_data: bytes) -> Image.Image:
-    return Image.open(io.BytesIO(file_data)).convert("RGB")
-
+# INFERENCE_MODE=local (default) runs the model in this process.
+# INFERENCE_MODE=remote proxies predictions to inference/server.py, so API
+# workers never import TensorFlow or hold a copy of the model.
+INFERENCE_MODE = os.getenv("INFERENCE_MODE", "local").lower()
 
-def preprocess(img: Image.Image) -> np.ndarray:
-    img = img.resize(IMG_SIZE)
-    img_array = image.img_to_array(img)
-    img_array = img_array / 255.0  # Rescale
-    img_array = np.expand_dims(img_array, axis=0)  # Add batch dimension
-    return img_array
+if INFERENCE_MODE == "remote":
+    from inference.client import create_client
 
+    inference_client = create_client()
+else:
+    inference_client = None
+    # Load the trained model at import so a bad model fails startup
+    get_model()
 
-def predict_image(img_data: bytes) -> tuple[str, float]:
-    img = read_imagefile(img_data)
-    input_data = preprocess(img)
-    prediction = model.predict(input_data)
-    predicted_class = CLASS_NAMES[np.argmax(prediction)]
-    confidence = float(np.max(prediction))
-    return predicted_class, confidence
 
-
-@router.post("/")
+@router.post("/", dependencies=[Depends(inference_rate_limit)])
 async def predict(
     file: UploadFile = File(...),
     user_id: str = Form(...),  # Use Form(...) for multipart/form-data
@@ -83,15 +68,29 @@ async def predict(
                 status_code=400, detail="Uploaded file must be an image"
             )
 
-        # Read and process the image
-        file_data = await file.read()
-        image_base64 = base64.b64encode(file_data).decode("utf-8")
+        # Read the upload, enforcing the size limit while streaming
+        with stage_timer("predict", "upload_read"):
+            file_data = await read_upload(file)
+        image_sha256 = hashlib.sha256(file_data).hexdigest()
+
+        if inference_client is not None:
+            with stage_timer("predict", "inference_rpc"):
+                # The server may run another artifact; record the one it used
+                predicted_class, confidence, model_version = (
+                    await inference_client.predict(file_data)
+                )
+        else:
+            # Run synchronous prediction in a thread pool
+            loop = asyncio.get_event_loop()
+            predicted_class, confidence = await loop.run_in_executor(
+                executor, predict_image, file_data
+            )
+            model_version = MODEL_VERSION
 
-        # Run synchronous prediction in a thread pool
-        loop = asyncio.get_event_loop()
-        predicted_class, confidence = await loop.run_in_executor(
-            executor, lambda: predict_image(file_data)
-        )
+        # Encode for storage only once the decoded image has been released
+        with stage_timer("predict", "base64_encode"):
+            image_base64 = base64.b64encode(file_data).decode("utf-8")
+        del file_data
 
         # Save the result to MongoDB
         scan_result = {
@@ -100,21 +99,63 @@ async def predict(
             "result": predicted_class,
             "confidence": confidence,
             "image_base64": image_base64,
+            "image_sha256": image_sha256,
+            "model_version": model_version,
         }
-        await db.scan_results.insert_one(scan_result)
+        with stage_timer("predict", "db_insert"):
+            if scan_results_writer is not None:
+                await scan_results_writer.put(scan_result)
+            else:
+                await db.scan_results.insert_one(scan_result)
 
         return JSONResponse(
             content={"predicted_class": predicted_class, "confidence": confidence}
         )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Error processing prediction: {str(e)}"
         )
 
 
-@router.get("/history/{user_id}")
+async def get_scan_summary(db, user_id: str) -> Dict[str, Any]:
+    """Count, latest timestamp and latest re-score of a user's scans.
+
+    Used to build ETags: any new or re-scored scan changes one of these, so
+    unchanged dashboards can be answered with 304 without running the
+    heavier queries.
+    """
+    result = await db.scan_results.aggregate(
+        [
+            {"$match": {"user_id": user_id}},
+            {
+                "$group": {
+                    "_id": None,
+                    "count": {"$sum": 1},
+                    "latest": {"$max": "$timestamp"},
+                    "rescored": {"$max": "$rescored_at"},
+                }
+            },
+        ]
+    ).to_list(length=1)
+    if not result:
+        return {"count": 0, "latest": None, "rescored": None}
+    return {
+        "count": result[0]["count"],
+        "latest": result[0]["latest"],
+        "rescored": result[0].get("rescored"),
+    }
+
+
+@router.get("/history/{user_id}", dependencies=[Depends(read_rate_limit)])
 async def get_scan_history(
-    user_id: str, page: int = 1, limit: int = 10, db: Collection = Depends(get_db)
+    user_id: str,
+    request: Request,
+    response: Response,
+    page: int = 1,
+    limit: int = 10,
+    db: Collection = Depends(get_db),
 ) -> Dict[str, Any]:
     try:
         # Calculate skip and limit for pagination
@@ -122,7 +163,21 @@ async def get_scan_history(
         logger.info(
             f"Querying history for user_id: {user_id}, page: {page}, limit: {limit}, skip: {skip}"
         )
-        total_records = await db.scan_results.count_documents({"user_id": user_id})
+        summary = await get_scan_summary(db, user_id)
+        etag = make_etag(
+            "history",
+            user_id,
+            summary["count"],
+            summary["latest"],
+            summary["rescored"],
+            page,
+            limit,
+        )
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        response.headers.update(cache_headers(etag))
+
+        total_records = summary["count"]
         logger.info(f"Total records found: {total_records}")
 
         # Fetch paginated history for the user
@@ -154,9 +209,28 @@ async def get_scan_history(
         )
 
 
-@router.get("/stats/{user_id}/condition-frequency")
-async def get_condition_frequency(user_id: str, db: Collection = Depends(get_db)):
+@router.get(
+    "/stats/{user_id}/condition-frequency", dependencies=[Depends(read_rate_limit)]
+)
+async def get_condition_frequency(
+    user_id: str,
+    request: Request,
+    response: Response,
+    db: Collection = Depends(get_db),
+):
     try:
+        summary = await get_scan_summary(db, user_id)
+        etag = make_etag(
+            "condition-frequency",
+            user_id,
+            summary["count"],
+            summary["latest"],
+            summary["rescored"],
+        )
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        response.headers.update(cache_headers(etag))
+
         pipeline = [
             {"$match": {"user_id": user_id}},
             {
@@ -190,9 +264,28 @@ async def get_condition_frequency(user_id: str, db: Collection = Depends(get_db)
         )
 
 
-@router.get("/stats/{user_id}/condition-distribution")
-async def get_condition_distribution(user_id: str, db: Collection = Depends(get_db)):
+@router.get(
+    "/stats/{user_id}/condition-distribution", dependencies=[Depends(read_rate_limit)]
+)
+async def get_condition_distribution(
+    user_id: str,
+    request: Request,
+    response: Response,
+    db: Collection = Depends(get_db),
+):
     try:
+        summary = await get_scan_summary(db, user_id)
+        etag = make_etag(
+            "condition-distribution",
+            user_id,
+            summary["count"],
+            summary["latest"],
+            summary["rescored"],
+        )
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        response.headers.update(cache_headers(etag))
+
         pipeline = [
             {"$match": {"user_id": user_id}},
             {"$group": {"_id": "$result", "count": {"$sum": 1}}},
@@ -206,9 +299,28 @@ async def get_condition_distribution(user_id: str, db: Collection = Depends(get_
         )
 
 
-@router.get("/stats/{user_id}/scan-frequency-by-day")
-async def get_scan_frequency_by_day(user_id: str, db: Collection = Depends(get_db)):
+@router.get(
+    "/stats/{user_id}/scan-frequency-by-day", dependencies=[Depends(read_rate_limit)]
+)
+async def get_scan_frequency_by_day(
+    user_id: str,
+    request: Request,
+    response: Response,
+    db: Collection = Depends(get_db),
+):
     try:
+        summary = await get_scan_summary(db, user_id)
+        etag = make_etag(
+            "scan-frequency-by-day",
+            user_id,
+            summary["count"],
+            summary["latest"],
+            summary["rescored"],
+        )
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        response.headers.update(cache_headers(etag))
+
         pipeline = [
             {"$match": {"user_id": user_id}},
             {"$group": {"_id": {"$dayOfWeek": "$timestamp"}, "count": {"$sum": 1}}},
@@ -231,9 +343,28 @@ async def get_scan_frequency_by_day(user_id: str, db: Collection = Depends(get_d
         )
 
 
-@router.get("/stats/{user_id}/condition-by-confidence")
-async def get_condition_by_confidence(user_id: str, db: Collection = Depends(get_db)):
+@router.get(
+    "/stats/{user_id}/condition-by-confidence", dependencies=[Depends(read_rate_limit)]
+)
+async def get_condition_by_confidence(
+    user_id: str,
+    request: Request,
+    response: Response,
+    db: Collection = Depends(get_db),
+):
     try:
+        summary = await get_scan_summary(db, user_id)
+        etag = make_etag(
+            "condition-by-confidence",
+            user_id,
+            summary["count"],
+            summary["latest"],
+            summary["rescored"],
+        )
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        response.headers.update(cache_headers(etag))
+
         pipeline = [
             {"$match": {"user_id": user_id}},
             {
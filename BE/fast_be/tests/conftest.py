@@ -0,0 +1,9 @@
+import os
+import sys
+
+# Run against the stub model so the tests need neither TensorFlow nor the
+# trained model file; must be set before inference.model is imported
+os.environ.setdefault("FDP_STUB_MODEL", "1")
+
+# Modules import each other as top-level packages (config, utils, ...)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
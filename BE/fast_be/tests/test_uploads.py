@@ -0,0 +1,92 @@
+import asyncio
+import io
+import tracemalloc
+
+import numpy as np
+import pytest
+from fastapi import HTTPException
+from PIL import Image
+from starlette.datastructures import UploadFile
+
+from inference.model import IMG_SIZE, predict_image
+from utils.uploads import MAX_UPLOAD_BYTES, UploadLimitMiddleware, read_upload
+
+# float32 model input built by preprocess()
+MODEL_INPUT_BYTES = IMG_SIZE[0] * IMG_SIZE[1] * 3 * 4
+# Interpreter, numpy and asyncio bookkeeping
+SLACK_BYTES = 1024 * 1024
+
+
+def make_jpeg(width: int, height: int) -> bytes:
+    # Noise barely compresses, so the upload is several MB
+    pixels = np.random.default_rng(0).integers(
+        0, 256, (height, width, 3), dtype=np.uint8
+    )
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, "JPEG", quality=95)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize("known_size", [True, False])
+def test_predict_request_peak_memory(known_size):
+    """Peak memory of reading and scoring one upload of R bytes.
+
+    Documents the per-request budget noted above read_imagefile(): one copy
+    of the upload plus the model input. The decoded RGB image is allocated
+    by PIL outside the Python allocator, so tracemalloc does not see it.
+    Joining chunks or copying the upload for decoding would add another R
+    and fail here.
+    """
+    image = make_jpeg(2400, 1800)
+    assert 4 * 1024 * 1024 < len(image) <= MAX_UPLOAD_BYTES
+    predict_image(image)  # load the model and warm up PIL/numpy
+    upload = UploadFile(io.BytesIO(image), size=len(image) if known_size else None)
+
+    async def handle():
+        file_data = await read_upload(upload)
+        assert file_data == image
+        return predict_image(file_data)
+
+    tracemalloc.start()
+    try:
+        # Return only the prediction: asyncio.run formats the task result,
+        # which would itself allocate several copies of a returned buffer
+        asyncio.run(handle())
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert peak < len(image) + 2 * MODEL_INPUT_BYTES + SLACK_BYTES
+
+
+def test_read_upload_rejects_oversized_stream():
+    upload = UploadFile(io.BytesIO(b"x" * 2048), size=None)
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(read_upload(upload, max_bytes=1024))
+    assert excinfo.value.status_code == 413
+
+
+def test_upload_limit_rejects_large_content_length_before_reading_body():
+    called = []
+    sent = []
+
+    async def app(scope, receive, send):
+        called.append(scope["path"])
+
+    async def receive():
+        raise AssertionError("body must not be read")
+
+    async def send(message):
+        sent.append(message)
+
+    middleware = UploadLimitMiddleware(app, max_body_bytes=1024)
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/api/predict/",
+        "headers": [(b"content-length", b"4096")],
+    }
+    asyncio.run(middleware(scope, receive, send))
+
+    assert not called
+    assert sent[0]["status"] == 413
@@ -0,0 +1,157 @@
+import functools
+import gzip
+import os
+
+import anyio
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; fall back to gzip only
+    brotli = None
+
+# Compression settings (all optional, read from the environment)
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+# Bodies above this are compressed in a worker thread instead of on the loop
+COMPRESSION_THREAD_MIN_SIZE = int(
+    os.getenv("COMPRESSION_THREAD_MIN_SIZE", str(64 * 1024))
+)
+# Larger bodies are mostly base64 image data (scan history), which shrinks
+# by only ~25% for seconds of CPU; send them as-is
+COMPRESSION_MAX_SIZE = int(os.getenv("COMPRESSION_MAX_SIZE", str(4 * 1024 * 1024)))
+
+# Already-compressed payloads gain nothing from another pass
+_SKIP_CONTENT_TYPES = ("image/", "video/", "audio/", "application/zip")
+
+
+def _accepted_encodings(scope) -> dict:
+    """Parse Accept-Encoding into {coding: q}."""
+    for name, value in scope["headers"]:
+        if name == b"accept-encoding":
+            accepted = {}
+            for part in value.decode("latin-1").split(","):
+                coding, _, params = part.strip().partition(";")
+                q = 1.0
+                params = params.strip()
+                if params.startswith("q="):
+                    try:
+                        q = float(params[2:])
+                    except ValueError:
+                        q = 0.0
+                if coding:
+                    accepted[coding.lower()] = q
+            return accepted
+    return {}
+
+
+def choose_encoding(scope):
+    accepted = _accepted_encodings(scope)
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0 or accepted.get("*", 0) > 0:
+        return "gzip"
+    return None
+
+
+def _with_vary(raw_headers):
+    """Add Accept-Encoding to Vary so shared caches keep variants apart."""
+    headers = []
+    vary = None
+    for name, value in raw_headers:
+        if name.lower() == b"vary":
+            vary = value
+        else:
+            headers.append((name, value))
+    if vary is None:
+        vary = b"Accept-Encoding"
+    elif b"accept-encoding" not in vary.lower():
+        vary += b", Accept-Encoding"
+    headers.append((b"vary", vary))
+    return headers
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+class CompressionMiddleware:
+    """Pure ASGI middleware negotiating brotli/gzip for single-body responses.
+
+    Bodies under ``minimum_size`` or over ``maximum_size`` bytes, streamed
+    bodies, already-encoded responses and media types that are compressed
+    already pass through as-is. Large bodies are compressed in a worker
+    thread so the event loop keeps serving other requests meanwhile.
+    """
+
+    def __init__(
+        self,
+        app,
+        minimum_size: int = COMPRESSION_MIN_SIZE,
+        maximum_size: int = COMPRESSION_MAX_SIZE,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.maximum_size = maximum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(scope)
+        start_message = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            raw_headers = start_message.get("headers", [])
+            headers = {k.lower(): v for k, v in raw_headers}
+            content_type = headers.get(b"content-type", b"").decode("latin-1")
+            passthrough = True
+            if b"content-encoding" in headers or content_type.startswith(
+                _SKIP_CONTENT_TYPES
+            ):
+                await send(start_message)
+                await send(message)
+                return
+            if (
+                encoding is None
+                or message.get("more_body", False)
+                or not self.minimum_size <= len(body) <= self.maximum_size
+            ):
+                # Uncompressed, but another Accept-Encoding could get a
+                # compressed variant of the same URL
+                await send({**start_message, "headers": _with_vary(raw_headers)})
+                await send(message)
+                return
+
+            if len(body) >= COMPRESSION_THREAD_MIN_SIZE:
+                body = await anyio.to_thread.run_sync(
+                    functools.partial(_compress, body, encoding)
+                )
+            else:
+                body = _compress(body, encoding)
+            raw_headers = [
+                (k, v) for k, v in raw_headers if k.lower() != b"content-length"
+            ]
+            raw_headers += [
+                (b"content-encoding", encoding.encode("latin-1")),
+                (b"content-length", str(len(body)).encode("latin-1")),
+            ]
+            await send({**start_message, "headers": _with_vary(raw_headers)})
+            await send({**message, "body": body})
+
+        await self.app(scope, receive, send_wrapper)
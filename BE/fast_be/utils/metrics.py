@@ -0,0 +1,211 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+from pymongo import monitoring
+
+# Latency buckets in seconds (upper bounds, Prometheus "le" labels)
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram keyed by a tuple of label values."""
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._lock = threading.Lock()
+        # labels -> [bucket counts..., sum, count]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, labels: Tuple[str, ...], value: float) -> None:
+        index = bisect_left(LATENCY_BUCKETS, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = [0] * (len(LATENCY_BUCKETS) + 2)
+                self._series[labels] = series
+            if index < len(LATENCY_BUCKETS):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.help_text}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self._lock:
+            snapshot = {k: list(v) for k, v in self._series.items()}
+        for labels, series in sorted(snapshot.items()):
+            base = _format_labels(self.label_names, labels)
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, series):
+                cumulative += count
+                lines.append(
+                    f'{self.name}_bucket{{{base},le="{bound}"}} {cumulative}'
+                )
+            lines.append(f'{self.name}_bucket{{{base},le="+Inf"}} {series[-1]}')
+            lines.append(f"{self.name}_sum{{{base}}} {series[-2]}")
+            lines.append(f"{self.name}_count{{{base}}} {series[-1]}")
+        return lines
+
+
+class Counter:
+    """Monotonic counter keyed by a tuple of label values."""
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, labels: Tuple[str, ...], amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.help_text}",
+            f"# TYPE {self.name} counter",
+        ]
+        with self._lock:
+            snapshot = dict(self._values)
+        for labels, value in sorted(snapshot.items()):
+            lines.append(
+                f"{self.name}{{{_format_labels(self.label_names, labels)}}} {value}"
+            )
+        return lines
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    return ",".join(
+        f'{name}="{_escape(value)}"' for name, value in zip(names, values)
+    )
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+# Metric registry
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route.",
+    ("method", "route", "status"),
+)
+STAGE_LATENCY = Histogram(
+    "stage_duration_seconds",
+    "Latency of individual hot-path stages.",
+    ("handler", "stage"),
+)
+MONGO_OPERATIONS = Counter(
+    "mongo_operations_total",
+    "MongoDB commands issued, by collection and command.",
+    ("collection", "command", "outcome"),
+)
+
+METRICS = [REQUEST_LATENCY, STAGE_LATENCY, MONGO_OPERATIONS]
+
+
+def render_metrics() -> str:
+    lines: List[str] = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+@contextmanager
+def stage_timer(handler: str, stage: str):
+    """Time a block of code and record it under (handler, stage)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_LATENCY.observe((handler, stage), time.perf_counter() - start)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording per-route request latency.
+
+    The route label is the matched path template (e.g. /api/predict/history/{user_id})
+    so per-user paths do not blow up the series count.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            REQUEST_LATENCY.observe(
+                (scope["method"], route_path, str(status_code)),
+                time.perf_counter() - start,
+            )
+
+
+class MongoCommandCounter(monitoring.CommandListener):
+    """PyMongo command listener counting operations per collection."""
+
+    # Commands whose first field is not a collection name
+    _IGNORED = {"isMaster", "ismaster", "hello", "ping", "buildInfo", "buildinfo"}
+
+    def __init__(self):
+        # request_id -> (collection, command); only touched from driver threads
+        self._pending: Dict[int, Tuple[str, str]] = {}
+
+    def started(self, event):
+        if event.command_name in self._IGNORED:
+            return
+        if event.command_name == "getMore":
+            # getMore's first field is the cursor id; the collection has its own
+            collection = event.command.get("collection")
+        else:
+            collection = event.command.get(event.command_name)
+        if not isinstance(collection, str):
+            collection = "-"
+        self._pending[event.request_id] = (collection, event.command_name)
+
+    def succeeded(self, event):
+        labels = self._pending.pop(event.request_id, None)
+        if labels is not None:
+            MONGO_OPERATIONS.inc(labels + ("success",))
+
+    def failed(self, event):
+        labels = self._pending.pop(event.request_id, None)
+        if labels is not None:
+            MONGO_OPERATIONS.inc(labels + ("failure",))
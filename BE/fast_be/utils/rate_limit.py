@@ -0,0 +1,227 @@
+import ipaddress
+import logging
+import math
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+from fastapi import HTTPException, Request
+
+try:
+    import redis.asyncio as redis_asyncio
+except ImportError:  # redis is optional; only needed for the shared backend
+    redis_asyncio = None
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, str(default)))
+
+
+# Rate limit settings (all optional, read from the environment)
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory").lower()
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0")
+# Behind a reverse proxy every request arrives from the proxy's address, so
+# without this all clients share one IP bucket (capping the whole service at
+# the per-IP rate). Enable it only when the proxy sets X-Forwarded-For, and
+# set RATE_LIMIT_TRUSTED_PROXIES to the number of proxies in the chain.
+RATE_LIMIT_TRUST_FORWARDED = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "0").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+# Number of proxies in front of the app that append to X-Forwarded-For. The
+# client address is taken this many entries from the right; anything further
+# left was sent by the client and cannot be trusted.
+RATE_LIMIT_TRUSTED_PROXIES = int(os.getenv("RATE_LIMIT_TRUSTED_PROXIES", "1"))
+# Upper bound on buckets kept in process; full buckets are pruned first
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+
+# (rate in tokens per second, burst capacity) per policy and key type
+LIMITS: Dict[str, Dict[str, Tuple[float, float]]] = {
+    "inference": {
+        "user": (
+            _env_float("RATE_LIMIT_INFERENCE_USER_RATE", 0.2),
+            _env_float("RATE_LIMIT_INFERENCE_USER_BURST", 5),
+        ),
+        "ip": (
+            _env_float("RATE_LIMIT_INFERENCE_IP_RATE", 1.0),
+            _env_float("RATE_LIMIT_INFERENCE_IP_BURST", 20),
+        ),
+    },
+    # Read endpoints name the resource being read (a doctor's profile, a
+    # user's history) in the path, not the caller, so they are per-IP only
+    "read": {
+        "ip": (
+            _env_float("RATE_LIMIT_READ_IP_RATE", 20.0),
+            _env_float("RATE_LIMIT_READ_IP_BURST", 100),
+        ),
+    },
+}
+
+
+class MemoryBackend:
+    """In-process token buckets. Only touched from the event loop thread."""
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        # key -> [tokens, last refill time, rate, burst]
+        self._buckets: Dict[str, list] = {}
+
+    async def take(self, key: str, rate: float, burst: float) -> float:
+        """Take one token; return 0 if allowed, else seconds until one refills."""
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                self._prune(now)
+            bucket = [burst, now, rate, burst]
+            self._buckets[key] = bucket
+        else:
+            bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0.0
+        return (1 - bucket[0]) / rate
+
+    def _prune(self, now: float) -> None:
+        # A bucket that has refilled completely carries no state worth keeping
+        full = [
+            key
+            for key, (tokens, last, rate, burst) in self._buckets.items()
+            if tokens + (now - last) * rate >= burst
+        ]
+        for key in full:
+            del self._buckets[key]
+        if len(self._buckets) >= self.max_keys:
+            # Still over: drop the oldest half by insertion order
+            for key in list(self._buckets)[: len(self._buckets) // 2]:
+                del self._buckets[key]
+
+
+# Atomic token bucket; uses the server clock so API hosts need not agree
+_REDIS_TOKEN_BUCKET = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local t = redis.call("TIME")
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local data = redis.call("HMGET", KEYS[1], "tokens", "ts")
+local tokens = tonumber(data[1]) or burst
+local ts = tonumber(data[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call("HSET", KEYS[1], "tokens", tokens, "ts", now)
+redis.call("EXPIRE", KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(wait)
+"""
+
+
+class RedisBackend:
+    """Token buckets shared across workers and hosts through Redis."""
+
+    def __init__(self, url: str = RATE_LIMIT_REDIS_URL):
+        if redis_asyncio is None:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requires the 'redis' package")
+        self._client = redis_asyncio.from_url(url)
+        self._script = self._client.register_script(_REDIS_TOKEN_BUCKET)
+
+    async def take(self, key: str, rate: float, burst: float) -> float:
+        return float(await self._script(keys=[f"ratelimit:{key}"], args=[rate, burst]))
+
+
+def create_backend():
+    if RATE_LIMIT_BACKEND == "redis":
+        return RedisBackend()
+    return MemoryBackend()
+
+
+backend = create_backend()
+
+_proxy_warning_logged = False
+
+
+def _warn_if_behind_proxy(host: str) -> None:
+    global _proxy_warning_logged
+    if _proxy_warning_logged:
+        return
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return
+    if address.is_private or address.is_loopback:
+        _proxy_warning_logged = True
+        logger.warning(
+            f"Rate limiting by peer address {host}, which looks like a proxy; "
+            "all clients behind it share one IP bucket. Set "
+            "RATE_LIMIT_TRUST_FORWARDED=1 if the proxy sets X-Forwarded-For."
+        )
+
+
+def client_ip(request: Request) -> str:
+    if RATE_LIMIT_TRUST_FORWARDED:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            entries = [entry.strip() for entry in forwarded.split(",")]
+            return entries[max(0, len(entries) - RATE_LIMIT_TRUSTED_PROXIES)]
+    if not request.client:
+        return "unknown"
+    _warn_if_behind_proxy(request.client.host)
+    return request.client.host
+
+
+class RateLimit:
+    """FastAPI dependency enforcing one policy per client IP and, where the
+    policy has a "user" limit, per calling user.
+
+    The caller is taken from the ``user_id`` form field (already parsed and
+    cached by FastAPI) on multipart endpoints such as POST /api/predict/.
+    """
+
+    def __init__(self, policy: str):
+        self.policy = policy
+        self.limits = LIMITS[policy]
+
+    async def _user_id(self, request: Request) -> Optional[str]:
+        if "user" not in self.limits:
+            return None
+        content_type = request.headers.get("content-type", "")
+        if content_type.startswith("multipart/form-data"):
+            user_id = (await request.form()).get("user_id")
+            if isinstance(user_id, str):
+                return user_id
+        return None
+
+    async def __call__(self, request: Request) -> None:
+        if not RATE_LIMIT_ENABLED:
+            return
+        # IP first: a request it rejects must not spend the user's token
+        checks = [("ip", client_ip(request))]
+        user_id = await self._user_id(request)
+        if user_id:
+            checks.append(("user", user_id))
+        for key_type, key in checks:
+            rate, burst = self.limits[key_type]
+            wait = await backend.take(f"{self.policy}:{key_type}:{key}", rate, burst)
+            if wait > 0:
+                raise HTTPException(
+                    status_code=429,
+                    detail="Too many requests",
+                    headers={"Retry-After": str(max(1, math.ceil(wait)))},
+                )
+
+
+inference_rate_limit = RateLimit("inference")
+read_rate_limit = RateLimit("read")
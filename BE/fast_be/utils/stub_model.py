@@ -0,0 +1,26 @@
+import time
+
+import numpy as np
+
+
+class StubModel:
+    """Deterministic stand-in for the Keras model.
+
+    Mimics ``model.predict`` on a (batch, 224, 224, 3) float array and returns
+    softmax-like scores derived from the mean pixel value, so results are
+    stable per image. An optional delay approximates real inference cost.
+    """
+
+    def __init__(self, num_classes: int, delay: float = 0.0):
+        self.num_classes = num_classes
+        self.delay = delay
+
+    def predict(self, input_data: np.ndarray, verbose=0) -> np.ndarray:
+        if self.delay:
+            time.sleep(self.delay * len(input_data))
+        means = input_data.reshape(len(input_data), -1).mean(axis=1)
+        logits = np.cos(
+            np.outer(means * 10.0, np.arange(1, self.num_classes + 1))
+        ).astype(np.float32)
+        exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+        return exp / exp.sum(axis=1, keepdims=True)
@@ -0,0 +1,181 @@
+import io
+import os
+import warnings
+
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+from PIL import Image
+
+# Upload limits (all optional, read from the environment)
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+MAX_IMAGE_DIMENSION = int(os.getenv("MAX_IMAGE_DIMENSION", "8000"))
+MAX_IMAGE_PIXELS = int(os.getenv("MAX_IMAGE_PIXELS", str(40_000_000)))
+# Whole request bodies may exceed the file by the multipart framing and the
+# other form fields (user_id)
+MAX_REQUEST_BYTES = MAX_UPLOAD_BYTES + 64 * 1024
+READ_CHUNK_SIZE = 256 * 1024
+
+# PIL's own decompression-bomb threshold; DecompressionBombWarning is raised
+# above it and DecompressionBombError above twice it. Both are turned into
+# errors by open_image_checked().
+Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+
+
+async def read_upload(
+    file: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES
+) -> bytearray:
+    """Read an upload in chunks, rejecting it as soon as it exceeds max_bytes.
+
+    The upload is copied into one buffer, preallocated from ``file.size``
+    when it is known. That buffer is shared by hashing, decoding (see
+    open_image_checked) and the base64 encode for storage.
+    """
+    if file.size is not None and file.size > max_bytes:
+        raise HTTPException(
+            status_code=413, detail=f"Upload exceeds {max_bytes} bytes"
+        )
+
+    buffer = bytearray(file.size or 0)
+    total = 0
+    while True:
+        chunk = await file.read(READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        end = total + len(chunk)
+        if end > max_bytes:
+            raise HTTPException(
+                status_code=413, detail=f"Upload exceeds {max_bytes} bytes"
+            )
+        # Fills the preallocated buffer in place; only grows it when the
+        # size was unknown or understated
+        buffer[total:end] = chunk
+        total = end
+    del buffer[total:]
+    return buffer
+
+
+class _BufferReader(io.RawIOBase):
+    """Seekable read-only file over a buffer, without copying it.
+
+    io.BytesIO only shares the memory of ``bytes``; over a bytearray it
+    would take a full copy of the upload.
+    """
+
+    def __init__(self, data):
+        self._view = memoryview(data)
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        n = min(len(b), len(self._view) - self._pos)
+        if n <= 0:
+            return 0
+        b[:n] = self._view[self._pos : self._pos + n]
+        self._pos += n
+        return n
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        self._pos = max(0, offset)
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+    def close(self) -> None:
+        self._view.release()
+        super().close()
+
+
+class UploadLimitMiddleware:
+    """Pure ASGI middleware bounding request bodies on upload endpoints.
+
+    Requests announcing a larger Content-Length are answered with 413 before
+    any of the body is received; otherwise the body is counted as it
+    arrives and the request fails with 413 as soon as it passes the limit,
+    instead of after Starlette has spooled the whole multipart body to disk.
+    """
+
+    def __init__(
+        self,
+        app,
+        paths=("/api/predict/",),
+        max_body_bytes: int = MAX_REQUEST_BYTES,
+    ):
+        self.app = app
+        self.paths = set(paths)
+        self.max_body_bytes = max_body_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                try:
+                    too_large = int(value) > self.max_body_bytes
+                except ValueError:
+                    too_large = False
+                if too_large:
+                    response = JSONResponse(
+                        status_code=413,
+                        content={
+                            "detail": f"Upload exceeds {MAX_UPLOAD_BYTES} bytes"
+                        },
+                    )
+                    await response(scope, receive, send)
+                    return
+                break
+
+        received = 0
+
+        async def receive_wrapper():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_bytes:
+                    # Raised inside the body parser; FastAPI passes
+                    # HTTPException through unchanged
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"Upload exceeds {MAX_UPLOAD_BYTES} bytes",
+                    )
+            return message
+
+        await self.app(scope, receive_wrapper, send)
+
+
+def open_image_checked(file_data: bytes) -> Image.Image:
+    """Open an image lazily and validate its header before any pixel decode.
+
+    Image.open only parses the header, so the dimension checks below run
+    before a single pixel is allocated.
+    """
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", Image.DecompressionBombWarning)
+            img = Image.open(_BufferReader(file_data))
+    except (Image.DecompressionBombError, Image.DecompressionBombWarning):
+        raise HTTPException(status_code=413, detail="Image has too many pixels")
+    except Exception:
+        raise HTTPException(status_code=400, detail="Uploaded file is not a valid image")
+
+    width, height = img.size
+    if width > MAX_IMAGE_DIMENSION or height > MAX_IMAGE_DIMENSION:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Image dimensions exceed {MAX_IMAGE_DIMENSION}px",
+        )
+    if width * height > MAX_IMAGE_PIXELS:
+        raise HTTPException(status_code=413, detail="Image has too many pixels")
+    return img
@@ -0,0 +1,222 @@
+import asyncio
+import glob
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+from bson import json_util
+from pymongo.errors import BulkWriteError
+
+from utils.metrics import STAGE_LATENCY
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Write-behind settings (all optional, read from the environment)
+WRITE_BEHIND_ENABLED = os.getenv("SCAN_WRITE_BEHIND", "0").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+QUEUE_MAX_SIZE = int(os.getenv("SCAN_WRITE_BEHIND_QUEUE_SIZE", "1000"))
+# Each scan carries its image as base64 (up to ~13MB at the 10MB upload
+# limit), so the queue is also bounded by the bytes it holds
+QUEUE_MAX_BYTES = int(os.getenv("SCAN_WRITE_BEHIND_MAX_BYTES", str(256 * 1024 * 1024)))
+BATCH_SIZE = int(os.getenv("SCAN_WRITE_BEHIND_BATCH_SIZE", "50"))
+FLUSH_INTERVAL = float(os.getenv("SCAN_WRITE_BEHIND_FLUSH_INTERVAL", "1.0"))
+MAX_RETRIES = int(os.getenv("SCAN_WRITE_BEHIND_MAX_RETRIES", "3"))
+# Base path; each process appends to <SPILL_PATH>.<pid>
+SPILL_PATH = os.getenv(
+    "SCAN_WRITE_BEHIND_SPILL_PATH",
+    os.path.join(os.path.dirname(__file__), "..", "scan_results_spill.jsonl"),
+)
+
+
+class WriteBehindQueue:
+    """Buffers documents in memory and flushes them with insert_many.
+
+    A batch is flushed when it reaches ``batch_size`` documents or when
+    ``flush_interval`` seconds have passed since its first document. Failed
+    batches are retried with backoff and, if Mongo stays unreachable, appended
+    to a local JSONL spill file that is replayed on the next start. Requests
+    never wait on Mongo: when the queue is full, documents go straight to the
+    spill file. The queue is bounded both by document count and by the bytes
+    of the images it holds.
+    """
+
+    def __init__(
+        self,
+        collection,
+        max_size: int = QUEUE_MAX_SIZE,
+        max_bytes: int = QUEUE_MAX_BYTES,
+        batch_size: int = BATCH_SIZE,
+        flush_interval: float = FLUSH_INTERVAL,
+        max_retries: int = MAX_RETRIES,
+        spill_path: str = SPILL_PATH,
+    ):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.spill_base = spill_path
+        # One file per process: uvicorn workers must not append to, or
+        # replay, each other's spill files
+        self.spill_path = f"{spill_path}.{os.getpid()}"
+        self.max_bytes = max_bytes
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_size)
+        self._queued_bytes = 0
+        self._task: Optional[asyncio.Task] = None
+        self._pending: List[Dict[str, Any]] = []
+        # Set while the last flush ended in the spill file (Mongo unreachable)
+        self._spilling = False
+
+    @staticmethod
+    def _size(document: Dict[str, Any]) -> int:
+        return len(document.get("image_base64") or "")
+
+    async def put(self, document: Dict[str, Any]) -> None:
+        size = self._size(document)
+        # Mongo is not keeping up; blocking here would put its latency back
+        # on the request path
+        if self._queued_bytes + size > self.max_bytes or self.queue.full():
+            self._spill([document])
+            return
+        self.queue.put_nowait(document)
+        self._queued_bytes += size
+
+    def _release(self, batch: List[Dict[str, Any]]) -> None:
+        # Counted until written or spilled, not just until dequeued: the
+        # batch being flushed is held in memory too
+        self._queued_bytes -= sum(self._size(document) for document in batch)
+
+    async def start(self) -> None:
+        await self.replay_spill()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # Drain the partially collected batch and whatever is still queued
+        batch, self._pending = self._pending, []
+        while not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+            if len(batch) >= self.batch_size and not self._spilling:
+                await self._flush(batch)
+                batch = []
+        if not batch:
+            return
+        if self._spilling:
+            # Mongo was unreachable on the last flush; retrying every batch at
+            # full cost could outlast the shutdown grace period
+            self._spill(batch)
+        else:
+            await self._flush(batch)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            self._pending.append(await self.queue.get())
+            deadline = loop.time() + self.flush_interval
+            while len(self._pending) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    self._pending.append(
+                        await asyncio.wait_for(self.queue.get(), timeout)
+                    )
+                except asyncio.TimeoutError:
+                    break
+            # Hand the batch over before awaiting so stop() never sees it twice
+            batch, self._pending = self._pending, []
+            try:
+                await self._flush(batch)
+            except asyncio.CancelledError:
+                # Shutting down mid-flush: persist the in-flight batch locally
+                self._spill(batch)
+                raise
+            finally:
+                self._release(batch)
+
+    async def _flush(self, batch: List[Dict[str, Any]]) -> None:
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                await self.collection.insert_many(batch, ordered=False)
+                STAGE_LATENCY.observe(
+                    ("write_behind", "insert_many"), loop.time() - start
+                )
+                self._spilling = False
+                return
+            except Exception as e:
+                # Documents already written by an earlier attempt or replay
+                # surface as duplicate key errors; anything else is retried
+                if isinstance(e, BulkWriteError):
+                    errors = e.details.get("writeErrors", [])
+                    if errors and all(err.get("code") == 11000 for err in errors):
+                        self._spilling = False
+                        return
+                logger.warning(
+                    f"Write-behind flush of {len(batch)} scan results failed "
+                    f"(attempt {attempt}/{self.max_retries}): {str(e)}"
+                )
+                if attempt < self.max_retries:
+                    await asyncio.sleep(0.5 * 2 ** (attempt - 1))
+        self._spilling = True
+        self._spill(batch)
+
+    def _spill(self, batch: List[Dict[str, Any]]) -> None:
+        with open(self.spill_path, "a", encoding="utf-8") as f:
+            for document in batch:
+                f.write(json_util.dumps(document) + "\n")
+        logger.error(f"Spilled {len(batch)} scan results to {self.spill_path}")
+
+    async def replay_spill(self) -> None:
+        """Replay spill files left by this process's pid or by dead processes.
+
+        Each file is first claimed by renaming it to <base>.replay.<pid>, so
+        when several workers start together exactly one of them replays it.
+        A leftover claim from a dead process (interrupted replay) is claimed
+        again the same way.
+        """
+        claimed = f"{self.spill_base}.replay.{os.getpid()}"
+        for path in sorted(glob.glob(glob.escape(self.spill_base) + ".*")):
+            owner = path.rsplit(".", 1)[1]
+            if not owner.isdigit():
+                continue
+            if int(owner) != os.getpid() and _pid_alive(int(owner)):
+                continue  # another live worker's file
+            try:
+                os.replace(path, claimed)
+            except FileNotFoundError:
+                continue  # claimed by another worker first
+            with open(claimed, "r", encoding="utf-8") as f:
+                documents = [json_util.loads(line) for line in f if line.strip()]
+            logger.info(f"Replaying {len(documents)} spilled scan results")
+            for i in range(0, len(documents), self.batch_size):
+                await self._flush(documents[i : i + self.batch_size])
+            # Failed batches were spilled again to this process's own file
+            try:
+                os.remove(claimed)
+            except FileNotFoundError:
+                pass
+
+
+def _pid_alive(pid: int) -> bool:
+    if os.name == "nt":
+        # No cheap check here (os.kill would terminate the process), so
+        # Windows hosts must run one worker per spill path
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True